@@ -1,46 +1,106 @@
 import os
+import asyncio
 import logging
 import gradio as gr
-from typing import Dict, Any, Tuple, AsyncGenerator
-from course_generator import generate_course
+from typing import Dict, Any, List, Tuple, AsyncGenerator, AsyncIterator
 from course_storage import CourseStorage
 from progress_tracker import ProgressTracker
-import json
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+# Configure logging; an unknown LOG_LEVEL falls back to INFO instead of failing at startup
+_log_level_name = (os.getenv("LOG_LEVEL") or "INFO").upper()
+logging.basicConfig(
+    level=logging.getLevelNamesMapping().get(_log_level_name, logging.INFO),
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
 logger = logging.getLogger(__name__)
+if _log_level_name not in logging.getLevelNamesMapping():
+    logger.warning(f"Unknown LOG_LEVEL {_log_level_name!r}, using INFO")
+
+# Minimum seconds between streamed status updates sent to the browser
+STATUS_UPDATE_INTERVAL = 0.1
+
+# Generation updates buffered ahead of the UI before the producer waits
+UPDATE_QUEUE_SIZE = 8
+
+# Seconds to buffer session navigation before writing progress to disk
+PROGRESS_FLUSH_DELAY = 2.0
 
 class SessionState:
+    """Course navigation state for a single browser session"""
     def __init__(self):
         self.course = None
         self.course_id = None
         self.current_module_idx = 0
         self.current_session_idx = 0
+        self.current_question_idx = 0
         self.show_assessment = False
-        self.storage = CourseStorage()
-        self.progress = ProgressTracker()
+        self.rendered_sessions = {}  # (module_idx, session_idx) -> Markdown
+        self.pending_progress = None  # Buffered update_session_progress args
+        self.progress_flush_task = None
 
-state = SessionState()
+    def set_course(self, course_id: str, course: Dict[str, Any]):
+        """Make a course active and drop content rendered for the previous one"""
+        prepare_course(course)
+        self.course = course
+        self.course_id = course_id
+        self.rendered_sessions = {}
 
-def format_session_content(module: Dict[str, Any], session: Dict[str, Any], session_num: int) -> str:
-    """Format session content for display"""
-    return f"""# {module['title']} - Session {session_num}
+def prepare_course(course: Dict[str, Any]):
+    """Precompute per-session and per-question data used while delivering a course"""
+    for module in course.get("modules", []):
+        for session in module.get("sessions", []):
+            session["_objectives_md"] = "\n".join("- " + obj for obj in session.get("objectives", []))
+            for question in (session.get("assessment") or {}).get("questions", []):
+                if isinstance(question, dict):
+                    question["_normalized_answers"] = tuple(
+                        correct.lower().strip() for correct in question.get("correct_answers", [])
+                    )
+
+# Storage is shared by all sessions; per-user state lives in SessionState
+storage = CourseStorage()
+progress_tracker = ProgressTracker()
+_course_generator = None
 
-{session.get('title', '')}
+SESSION_TEMPLATE = """# {module_title} - Session {session_num}
 
-{session.get('description', '')}
+{title}
+
+{description}
 
 Learning Objectives:
-{chr(10).join('- ' + obj for obj in session.get('objectives', []))}
+{objectives}
 
-Duration: {session.get('duration', '45 minutes')}
+Duration: {duration}
 
 Content:
-{session.get('content', '')}
+{content}
 """
 
-def format_assessment(session: Dict[str, Any]) -> str:
+def format_session_content(module: Dict[str, Any], session: Dict[str, Any], session_num: int) -> str:
+    """Format session content for display"""
+    get = session.get
+    return SESSION_TEMPLATE.format(
+        module_title=module['title'],
+        session_num=session_num,
+        title=get('title', ''),
+        description=get('description', ''),
+        objectives=get('_objectives_md', ''),
+        duration=get('duration', '45 minutes'),
+        content=get('content', '')
+    )
+
+def render_session(state: SessionState, module_idx: int, session_idx: int) -> str:
+    """Render (and memoize) the session Markdown for the active course"""
+    key = (module_idx, session_idx)
+    content = state.rendered_sessions.get(key)
+    if content is None:
+        module = state.course["modules"][module_idx]
+        session = module["sessions"][session_idx]
+        content = format_session_content(module, session, session_idx + 1)
+        state.rendered_sessions[key] = content
+    return content
+
+def format_assessment(state: SessionState, session: Dict[str, Any]) -> str:
     """Format assessment questions"""
     if not session.get('assessment'):
         return "No assessment available for this session."
@@ -55,10 +115,54 @@ def format_assessment(session: Dict[str, Any]) -> str:
 {current_q.get('text', '')}
 """
 
+def schedule_progress_update(state: SessionState, course_id: str, module_idx: int, session_idx: int):
+    """Buffer a navigation progress update and write it after PROGRESS_FLUSH_DELAY"""
+    state.pending_progress = (course_id, module_idx, session_idx)
+    if state.progress_flush_task is None or state.progress_flush_task.done():
+        state.progress_flush_task = asyncio.create_task(_flush_progress_later(state))
+
+async def _flush_progress_later(state: SessionState):
+    # Keep flushing while navigation buffers new positions during a write
+    while state.pending_progress is not None:
+        await asyncio.sleep(PROGRESS_FLUSH_DELAY)
+        await flush_progress(state)
+
+async def flush_progress(state: SessionState):
+    """Write any buffered progress update to disk"""
+    pending, state.pending_progress = state.pending_progress, None
+    if pending is None:
+        return
+    try:
+        await asyncio.to_thread(progress_tracker.update_session_progress, *pending)
+    except Exception as e:
+        logger.error(f"Error saving progress: {str(e)}")
+
+def get_course_choices() -> List[Tuple[str, str]]:
+    """Get the saved-course dropdown choices; storage only rescans when the course directory changes"""
+    courses = storage.list_courses()
+    return [(k, f"{v['topic']} ({v['language']})") for k, v in courses.items()]
+
+def get_course_generator():
+    """Import the course generator on first use (it loads LangChain and the LLM client)"""
+    global _course_generator
+    if _course_generator is None:
+        import course_generator
+        _course_generator = course_generator
+    return _course_generator
+
+async def warm_up_model():
+    """Load the course generator and have Ollama load the model before the first request"""
+    try:
+        course_generator = await asyncio.to_thread(get_course_generator)
+        await course_generator.warm_up_llm()
+    except Exception as e:
+        logger.warning(f"Model warm-up skipped: {str(e)}")
+
 async def generate_with_status(topic: str, language: str) -> AsyncGenerator[Dict[str, Any], None]:
     """Generate course content with status updates"""
     try:
-        async for update in generate_course(topic, language):
+        course_generator = await asyncio.to_thread(get_course_generator)
+        async for update in course_generator.generate_course(topic, language):
             if isinstance(update, dict):
                 if "status" in update:
                     yield {
@@ -91,20 +195,52 @@ async def generate_with_status(topic: str, language: str) -> AsyncGenerator[Dict
             "error": str(e)
         }
 
-async def on_generate(topic: str, language: str = "English") -> AsyncGenerator[Tuple[str, str], None]:
+async def prefetch_updates(updates: AsyncIterator[Dict[str, Any]], maxsize: int = UPDATE_QUEUE_SIZE) -> AsyncGenerator[Dict[str, Any], None]:
+    """Drive an update stream from a background task through a bounded queue"""
+    queue = asyncio.Queue(maxsize=maxsize)
+    done = object()
+    
+    async def produce():
+        try:
+            async for update in updates:
+                await queue.put(update)
+        except Exception as e:
+            await queue.put(e)
+        else:
+            await queue.put(done)
+    
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            update = await queue.get()
+            if update is done:
+                break
+            if isinstance(update, Exception):
+                raise update
+            yield update
+    finally:
+        producer.cancel()
+
+async def on_generate(state: SessionState, topic: str, language: str = "English") -> AsyncGenerator[Tuple[str, str, SessionState], None]:
     """Handle generate button click with improved error handling"""
     try:
         status_text = "Starting course generation..."
-        content = ""
+        # Leave the Markdown untouched until there is real content to show
+        content = gr.update()
+        loop = asyncio.get_running_loop()
+        last_emit = 0.0
+        last_frame = None
         
-        async for update in generate_with_status(topic, language):
+        # Generation keeps running while the previous frame is streamed to the browser
+        async for update in prefetch_updates(generate_with_status(topic, language)):
             progress = update.get("progress", 0)
             status_text = f"{update['status']} ({progress}%)"
             
             if update.get("error"):
                 yield (
                     f"Error: {update['error']}",
-                    ""
+                    "",
+                    state
                 )
                 return
             
@@ -113,70 +249,85 @@ async def on_generate(topic: str, language: str = "English") -> AsyncGenerator[T
                 try:
                     course_data = update["course_state"]
                     if isinstance(course_data, dict) and course_data.get("modules"):
-                        state.course = course_data
                         # Save the course
-                        state.course_id = state.storage.save_course(state.course)
+                        course_id = await asyncio.to_thread(storage.save_course, course_data)
+                        state.set_course(course_id, course_data)
                         # Initialize progress
-                        state.progress.create_new_progress(state.course_id)
+                        await asyncio.to_thread(progress_tracker.create_new_progress, state.course_id)
                         # Format first session
                         current_module = state.course["modules"][0]
                         if current_module.get("sessions"):
-                            current_session = current_module["sessions"][0]
-                            content = format_session_content(current_module, current_session, 1)
+                            content = render_session(state, 0, 0)
                 except Exception as e:
                     logger.error(f"Error saving course: {str(e)}")
                     yield (
                         f"Error saving course: {str(e)}",
-                        ""
+                        "",
+                        state
                     )
                     return
             
+            # Skip frames identical to the last one sent
+            frame = (status_text, content)
+            if frame == last_frame:
+                continue
+            
+            # Coalesce intermediate updates; always emit the final one
+            now = loop.time()
+            if progress != 100 and now - last_emit < STATUS_UPDATE_INTERVAL:
+                continue
+            last_emit = now
+            last_frame = frame
+            
             yield (
                 status_text,
-                content
+                content,
+                state
             )
         
     except Exception as e:
         logger.error(f"Error generating course: {str(e)}")
         yield (
             f"Error: {str(e)}",
-            ""
+            "",
+            state
         )
 
-async def load_course(course_id: str) -> Tuple[str, str, bool, bool]:
+async def load_course(state: SessionState, course_id: str) -> Tuple[str, str, bool, bool, SessionState]:
     """Load an existing course"""
     try:
+        # Make sure buffered navigation is on disk before reading progress back
+        await flush_progress(state)
+        
         # Load course data
-        course_data = state.storage.load_course(course_id)
+        course_data = await asyncio.to_thread(storage.load_course, course_id)
         if not course_data:
-            return "Error: Course not found", "", False, False
+            return "Error: Course not found", "", False, False, state
         
         # Set course state
-        state.course = course_data
-        state.course_id = course_id
+        state.set_course(course_id, course_data)
         
         # Load progress
-        progress_data = state.progress.load_progress(course_id)
+        progress_data = await asyncio.to_thread(progress_tracker.load_progress, course_id)
         state.current_module_idx = progress_data['current_module']
         state.current_session_idx = progress_data['current_session']
         
         # Get current session content
-        current_module = state.course["modules"][state.current_module_idx]
-        current_session = current_module["sessions"][state.current_session_idx]
-        content = format_session_content(current_module, current_session, state.current_session_idx + 1)
+        content = render_session(state, state.current_module_idx, state.current_session_idx)
         
         return (
             f"Loaded course: {state.course['topic']}",
             content,
             True,  # Show submit button
-            True   # Show next button
+            True,  # Show next button
+            state
         )
         
     except Exception as e:
         logger.error(f"Error loading course: {str(e)}")
-        return f"Error loading course: {str(e)}", "", False, False
+        return f"Error loading course: {str(e)}", "", False, False, state
 
-async def submit_answer(answer: str) -> Tuple[str, str, str, bool, bool]:
+async def submit_answer(state: SessionState, answer: str) -> Tuple[str, str, str, bool, bool, SessionState]:
     """Submit an answer for evaluation"""
     if not state.course:
         return (
@@ -184,7 +335,8 @@ async def submit_answer(answer: str) -> Tuple[str, str, str, bool, bool]:
             "",
             "",
             False,
-            False
+            False,
+            state
         )
     
     try:
@@ -197,10 +349,11 @@ async def submit_answer(answer: str) -> Tuple[str, str, str, bool, bool]:
             state.current_question_idx = 0
             return (
                 "Starting assessment",
-                format_assessment(current_session),
+                format_assessment(state, current_session),
                 "",
                 True,
-                False
+                False,
+                state
             )
         
         # Evaluate answer
@@ -215,7 +368,9 @@ async def submit_answer(answer: str) -> Tuple[str, str, str, bool, bool]:
         state.current_question_idx += 1
         if state.current_question_idx >= len(questions):
             # Complete session
-            state.progress.update_session_progress(
+            await flush_progress(state)
+            await asyncio.to_thread(
+                progress_tracker.update_session_progress,
                 state.course_id,
                 state.current_module_idx,
                 state.current_session_idx,
@@ -227,16 +382,18 @@ async def submit_answer(answer: str) -> Tuple[str, str, str, bool, bool]:
                 feedback + "\n\nClick 'Next Session' to continue.",
                 "",
                 False,
-                True
+                True,
+                state
             )
         
         # Show next question
         return (
             feedback,
-            format_assessment(current_session),
+            format_assessment(state, current_session),
             "",
             True,
-            False
+            False,
+            state
         )
         
     except Exception as e:
@@ -246,20 +403,23 @@ async def submit_answer(answer: str) -> Tuple[str, str, str, bool, bool]:
             "",
             "",
             False,
-            False
+            False,
+            state
         )
 
 def evaluate_answer(answer: str, question: Dict[str, Any]) -> bool:
     """Evaluate if the answer is correct"""
-    correct_answers = question.get('correct_answers', [])
+    correct_answers = question.get('_normalized_answers')
+    if correct_answers is None:
+        correct_answers = [correct.lower().strip() for correct in question.get('correct_answers', [])]
     if not correct_answers:
         return False
     
     # Simple string matching for now
     answer = answer.lower().strip()
-    return any(correct.lower().strip() in answer for correct in correct_answers)
+    return any(correct in answer for correct in correct_answers)
 
-async def next_session() -> Tuple[str, str, str, bool, bool]:
+async def next_session(state: SessionState) -> Tuple[str, str, str, bool, bool, SessionState]:
     """Move to the next session"""
     if not state.course:
         return (
@@ -267,7 +427,8 @@ async def next_session() -> Tuple[str, str, str, bool, bool]:
             "",
             "",
             False,
-            False
+            False,
+            state
         )
     
     try:
@@ -285,30 +446,31 @@ async def next_session() -> Tuple[str, str, str, bool, bool]:
                     "Congratulations! You have completed all sessions in this course.",
                     "",
                     False,
-                    False
+                    False,
+                    state
                 )
         
-        # Get new session content
-        current_module = state.course["modules"][state.current_module_idx]
-        current_session = current_module["sessions"][state.current_session_idx]
+        # Reset assessment state for the new session
         state.current_question_idx = 0
         state.show_assessment = False
         
-        # Update progress
-        state.progress.update_session_progress(
+        # Update progress (buffered; rapid navigation results in a single write)
+        schedule_progress_update(
+            state,
             state.course_id,
             state.current_module_idx,
             state.current_session_idx
         )
         
-        content = format_session_content(current_module, current_session, state.current_session_idx + 1)
+        content = render_session(state, state.current_module_idx, state.current_session_idx)
         
         return (
             f"Module {state.current_module_idx + 1}, Session {state.current_session_idx + 1}",
             content,
             "",
             True,
-            True
+            True,
+            state
         )
         
     except Exception as e:
@@ -318,12 +480,15 @@ async def next_session() -> Tuple[str, str, str, bool, bool]:
             "",
             "",
             False,
-            False
+            False,
+            state
         )
 
 def create_interface():
     """Create the Gradio interface with improved status display"""
-    with gr.Blocks(title="AI Learning Platform Generator") as app:
+    with gr.Blocks(title="AI Learning Platform Generator", analytics_enabled=False) as app:
+        session_state = gr.State(SessionState())
+        
         gr.Markdown("""
         # 🎓 AI Learning Platform Generator
         Generate personalized educational content with AI assistance.
@@ -343,14 +508,10 @@ def create_interface():
                     )
                     generate_btn = gr.Button("Generate Course", variant="primary")
         
-        with gr.Tab("Load Existing Course"):
-            def get_course_choices():
-                courses = state.storage.list_courses()
-                return [(k, f"{v['topic']} ({v['language']})") for k, v in courses.items()]
-            
+        with gr.Tab("Load Existing Course") as load_tab:
             courses_dropdown = gr.Dropdown(
                 label="Select a Course",
-                choices=get_course_choices(),
+                choices=[],  # Populated when the tab is opened
                 type="value",
                 value=None,
                 interactive=True
@@ -358,10 +519,11 @@ def create_interface():
             load_btn = gr.Button("Load Course")
             
             # Refresh course list when tab is selected
-            def refresh_courses():
-                return gr.Dropdown(choices=get_course_choices())
+            async def refresh_courses():
+                choices = await asyncio.to_thread(get_course_choices)
+                return gr.Dropdown(choices=choices)
             
-            courses_dropdown.change(
+            load_tab.select(
                 fn=refresh_courses,
                 inputs=[],
                 outputs=[courses_dropdown]
@@ -389,31 +551,44 @@ def create_interface():
         # Event handlers
         generate_btn.click(
             fn=on_generate,
-            inputs=[topic_input, language_input],
-            outputs=[status_output, content_output]
+            inputs=[session_state, topic_input, language_input],
+            outputs=[status_output, content_output, session_state],
+            concurrency_limit=4  # Bound concurrent LLM-heavy generations
         )
         
         load_btn.click(
             fn=load_course,
-            inputs=[courses_dropdown],
-            outputs=[status_output, content_output, submit_btn, next_btn]
+            inputs=[session_state, courses_dropdown],
+            outputs=[status_output, content_output, submit_btn, next_btn, session_state],
+            concurrency_limit=None
         )
         
         submit_btn.click(
             fn=submit_answer,
-            inputs=[answer_input],
-            outputs=[status_output, content_output, answer_input, submit_btn, next_btn]
+            inputs=[session_state, answer_input],
+            outputs=[status_output, content_output, answer_input, submit_btn, next_btn, session_state],
+            concurrency_limit=None
         )
         
         next_btn.click(
             fn=next_session,
-            inputs=[],
-            outputs=[status_output, content_output, answer_input, submit_btn, next_btn]
+            inputs=[session_state],
+            outputs=[status_output, content_output, answer_input, submit_btn, next_btn, session_state],
+            concurrency_limit=None
         )
         
+        app.load(fn=warm_up_model, concurrency_limit=None)
+        
     return app
 
 if __name__ == "__main__":
+    # uvloop is optional (not available on Windows); fall back to the default loop
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    
     app = create_interface()
-    app.queue()
-    app.launch(show_error=True)
+    app.queue(default_concurrency_limit=8, max_size=32)
+    app.launch(show_error=True, quiet=True)
@@ -1,43 +1,475 @@
-import json
+import asyncio
+import atexit
+import copy
+import functools
+import hashlib
+import itertools
 import logging
+import logging.handlers
 import os
+import queue
 import re
-from typing import Dict, List, TypedDict, Annotated, Optional, Union, AsyncIterator, Any, AsyncGenerator
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, Iterator, List, Tuple, TypedDict, Annotated, Optional, Union, AsyncIterator, Any, AsyncGenerator
+import httpx
+import orjson
 from dotenv import load_dotenv
-from langchain_community.chat_models import ChatOllama
-from langchain_core.messages import HumanMessage, SystemMessage
-from langgraph.graph import StateGraph, END
-from pydantic import BaseModel, Field, ValidationError, validator
+from langchain_ollama import ChatOllama
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from pydantic import BaseModel, BeforeValidator, Field, ValidationError, field_validator
 
+import json_utils
 from models import Course, Module, Session, Section, Assessment, Question
 
 load_dotenv()
 
-# Configure logging with more detail
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('course_generator.log')
-    ]
-)
+# Configure logging with more detail; file writes happen on a listener thread so they never block the event loop
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_log_queue = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(_log_queue, logging.FileHandler('course_generator.log', delay=True))
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+# Log level name from LOG_LEVEL; an unknown name falls back to INFO instead of failing at import
+_log_level_name = (os.getenv("LOG_LEVEL") or "INFO").upper()
+LOG_LEVEL = logging.getLevelNamesMapping().get(_log_level_name, logging.INFO)
+
+# No-op when the importing app has already configured the root logger
+logging.basicConfig(level=LOG_LEVEL, format=LOG_FORMAT)
+
+# Attach the file handler to this module's logger so course_generator.log is
+# written however the root logger was configured
+_log_queue_handler = logging.handlers.QueueHandler(_log_queue)
+_log_queue_handler.setFormatter(logging.Formatter(LOG_FORMAT))
 
 logger = logging.getLogger(__name__)
+logger.addHandler(_log_queue_handler)
+if _log_level_name not in logging.getLevelNamesMapping():
+    logger.warning(f"Unknown LOG_LEVEL {_log_level_name!r}, using INFO")
+
+# Seconds to wait for a single LLM call, and attempts before giving up
+LLM_TIMEOUT = 120
+LLM_MAX_RETRIES = 3
+
+# How long Ollama keeps the model loaded between requests
+LLM_KEEP_ALIVE = "30m"
+# Context window for every request; Ollama reloads the model when this differs between calls
+LLM_NUM_CTX = 4096
 
-# Initialize LLM with specific model settings
+# Maximum number of sessions generated concurrently against Ollama
+SESSION_CONCURRENCY = 4
+# Maximum number of modules processed concurrently
+MODULE_CONCURRENCY = 4
+
+def _env_int(name: str, default: int) -> int:
+    """Read a positive integer setting from the environment, falling back to default"""
+    try:
+        return max(1, int(os.getenv(name) or default))
+    except ValueError:
+        logger.warning(f"Ignoring invalid {name}={os.getenv(name)!r}, using {default}")
+        return default
+
+# Cap on in-flight LLM requests, and on the sections and assessments generate_course
+# requests at once; follows the server's OLLAMA_NUM_PARALLEL when it is set in this environment
+LLM_CONCURRENCY = _env_int("OLLAMA_NUM_PARALLEL", 8)
+# Consecutive successful LLM calls before the adaptive limit grows by one slot
+LLM_LIMIT_INCREASE_AFTER = 20
+
+# Seconds to wait for a connection to the Ollama server
+LLM_CONNECT_TIMEOUT = 5.0
+
+# HTTP client settings shared by both models: keep one warm connection per concurrent request
+LLM_CLIENT_KWARGS = {
+    "timeout": httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+    "limits": httpx.Limits(max_connections=LLM_CONCURRENCY, max_keepalive_connections=LLM_CONCURRENCY),
+}
+
+# Initialize LLM with specific model settings; each ChatOllama keeps one pooled AsyncClient
 try:
     llm = ChatOllama(
         model="llama3.2",
         temperature=0.7,
         top_k=50,
         top_p=0.9,
+        num_ctx=LLM_NUM_CTX,
+        keep_alive=LLM_KEEP_ALIVE,
+        client_kwargs=LLM_CLIENT_KWARGS,
+    )
+    # Same model constrained to emit JSON, for prompts with structured responses
+    json_llm = ChatOllama(
+        model="llama3.2",
+        temperature=0.7,
+        top_k=50,
+        top_p=0.9,
+        format="json",
+        num_ctx=LLM_NUM_CTX,
+        keep_alive=LLM_KEEP_ALIVE,
+        client_kwargs=LLM_CLIENT_KWARGS,
     )
     logger.info("Successfully initialized LLM")
 except Exception as e:
     logger.error(f"Error initializing LLM: {str(e)}", exc_info=True)
     raise
 
+def compact_prompt(prompt: str) -> str:
+    """Drop the source-code indentation and blank lines from a prompt so they don't cost prompt tokens"""
+    return "\n".join(filter(None, map(str.strip, prompt.split("\n"))))
+
+# System prompts, built once and shared by every call so each prompt starts with the same bytes
+OUTLINE_SYSTEM_MESSAGE = SystemMessage(content=(
+    "You are an expert curriculum designer specializing in creating focused, structured learning content.\n"
+    "Always create between 3-5 modules total, no more and no less."
+))
+MODULE_CONTENT_SYSTEM_MESSAGE = SystemMessage(content=(
+    "You are an expert educator and curriculum designer creating focused, practical learning content.\n"
+    "Create content that is clear, engaging, and builds understanding step by step,\n"
+    "organized into focused, achievable learning sessions.\n"
+    "Respond with JSON only."
+))
+SESSION_WITH_ASSESSMENT_SYSTEM_MESSAGE = SystemMessage(content=(
+    "You are an expert educator creating focused, practical learning content\n"
+    "and effective assessments. Create content that is clear, engaging, and builds understanding\n"
+    "step by step, and questions that are clear and unambiguous. Respond with JSON only."
+))
+CONTENT_SYSTEM_MESSAGE = SystemMessage(content=(
+    "You are an expert educator creating focused, practical learning content.\n"
+    "Create content that is clear, engaging, and builds understanding step by step.\n"
+    "Use markdown formatting for better readability."
+))
+CONTENT_JSON_SYSTEM_MESSAGE = SystemMessage(content=(
+    "You are an expert educator creating focused, practical learning content.\n"
+    "Create content that is clear, engaging, and builds understanding step by step.\n"
+    "Respond with JSON only."
+))
+ASSESSMENT_SYSTEM_MESSAGE = SystemMessage(content=(
+    "You are an expert in creating effective assessments.\n"
+    "Create questions that test both understanding and practical application.\n"
+    "Make questions clear and unambiguous."
+))
+ASSESSMENT_JSON_SYSTEM_MESSAGE = SystemMessage(content=(
+    "You are an expert in creating effective assessments.\n"
+    "Create questions that test both understanding and practical application.\n"
+    "Make questions clear and unambiguous. Respond with JSON only."
+))
+
+_warm_up_task: Optional[asyncio.Task] = None
+
+async def _warm_up() -> None:
+    """Send a minimal request so Ollama loads the model before the first real prompt"""
+    try:
+        # Passing options replaces the model's own, so repeat the ones the model is loaded with;
+        # otherwise it loads with the default context and the first real request reloads it
+        options = {"num_predict": 1, "num_ctx": LLM_NUM_CTX}
+        await asyncio.wait_for(llm.ainvoke([HumanMessage(content="hi")], options=options), LLM_TIMEOUT)
+        logger.info("LLM warm-up complete")
+    except Exception as e:
+        logger.warning(f"LLM warm-up failed: {str(e)}")
+
+def warm_up_llm() -> asyncio.Task:
+    """Start the model warm-up once per process and return its task"""
+    global _warm_up_task
+    if _warm_up_task is None:
+        _warm_up_task = asyncio.ensure_future(_warm_up())
+    return _warm_up_task
+
+# HTTP statuses Ollama uses when it is overloaded (queue full / too many requests)
+OVERLOAD_STATUS_CODES = (429, 503)
+
+def is_overload_error(e: BaseException) -> bool:
+    """Whether an LLM call failed because the server is saturated"""
+    return isinstance(e, asyncio.TimeoutError) or getattr(e, "status_code", None) in OVERLOAD_STATUS_CODES
+
+def is_transient_error(e: BaseException) -> bool:
+    """Whether an LLM call failed for a reason worth retrying (network, timeout or overload)"""
+    # httpx timeouts and connection failures are not OSErrors
+    return isinstance(e, (OSError, httpx.TransportError)) or is_overload_error(e)
+
+class AdaptiveLimiter:
+    """Concurrency limit that halves when the LLM server is overloaded and grows back one slot at a time"""
+    
+    def __init__(self, max_limit: int, increase_after: int):
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self.increase_after = increase_after
+        self.in_flight = 0
+        self.successes = 0
+        self.condition = asyncio.Condition()
+    
+    async def __aenter__(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self.condition:
+            self.in_flight -= 1
+            if exc is None:
+                self.successes += 1
+                if self.successes >= self.increase_after and self.limit < self.max_limit:
+                    self.limit += 1
+                    self.successes = 0
+                    logger.info(f"LLM concurrency limit raised to {self.limit}")
+            elif is_overload_error(exc):
+                self.successes = 0
+                if self.limit > 1:
+                    self.limit = max(1, self.limit // 2)
+                    logger.warning(f"LLM server overloaded, concurrency limit lowered to {self.limit}")
+            self.condition.notify_all()
+        return False
+
+_llm_limiter = AdaptiveLimiter(LLM_CONCURRENCY, LLM_LIMIT_INCREASE_AFTER)
+
+async def robust_ainvoke(messages: List[BaseMessage], chat_model: ChatOllama = llm,
+                         timeout: float = LLM_TIMEOUT, max_retries: int = LLM_MAX_RETRIES) -> BaseMessage:
+    """Invoke the LLM with a timeout, retrying transient failures with exponential backoff"""
+    for attempt in range(max_retries):
+        try:
+            async with _llm_limiter:
+                return await asyncio.wait_for(chat_model.ainvoke(messages), timeout)
+        except Exception as e:
+            if not is_transient_error(e) or attempt == max_retries - 1:
+                raise
+            delay = 2 ** attempt
+            logger.warning(f"LLM call failed ({type(e).__name__}: {str(e)}), retrying in {delay}s")
+            await asyncio.sleep(delay)
+
+# Maximum number of LLM responses kept in the in-memory exact-match cache
+LLM_CACHE_SIZE = 512
+_llm_cache: "OrderedDict[str, str]" = OrderedDict()
+
+def _llm_cache_key(messages: List[BaseMessage], chat_model: ChatOllama = llm) -> str:
+    """Build a cache key from the model settings and the prompt messages"""
+    settings = [chat_model.model, chat_model.temperature, chat_model.format]
+    payload = orjson.dumps([settings, [(m.type, m.content) for m in messages]])
+    return hashlib.blake2b(payload).hexdigest()
+
+def _llm_cache_get(key: str) -> Optional[str]:
+    content = _llm_cache.get(key)
+    if content is not None:
+        _llm_cache.move_to_end(key)
+        logger.debug("LLM cache hit")
+    return content
+
+def _llm_cache_put(key: str, content: str):
+    _llm_cache[key] = content
+    if len(_llm_cache) > LLM_CACHE_SIZE:
+        _llm_cache.popitem(last=False)
+
+# Optional SQLite file that keeps LLM responses across restarts (disabled when unset)
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB", "")
+# Seconds a persisted LLM response stays valid
+LLM_CACHE_TTL = 7 * 24 * 3600
+
+_disk_cache: Optional[sqlite3.Connection] = None
+_disk_cache_lock = threading.Lock()
+
+def _get_disk_cache() -> Optional[sqlite3.Connection]:
+    """Open the persistent LLM cache on first use, or return None when it is disabled"""
+    global _disk_cache
+    if not LLM_CACHE_DB:
+        return None
+    if _disk_cache is None:
+        conn = sqlite3.connect(LLM_CACHE_DB, check_same_thread=False)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, content TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        # Drop expired entries once per process so the file does not grow without bound
+        conn.execute("DELETE FROM llm_cache WHERE created <= ?", (time.time() - LLM_CACHE_TTL,))
+        conn.commit()
+        _disk_cache = conn
+    return _disk_cache
+
+def _disk_cache_get(key: str) -> Optional[str]:
+    """Read a non-expired response from the persistent cache"""
+    with _disk_cache_lock:
+        conn = _get_disk_cache()
+        if conn is None:
+            return None
+        row = conn.execute(
+            "SELECT content FROM llm_cache WHERE key = ? AND created > ?",
+            (key, time.time() - LLM_CACHE_TTL)
+        ).fetchone()
+    return row[0] if row else None
+
+def _disk_cache_put(key: str, content: str):
+    """Write a response to the persistent cache"""
+    with _disk_cache_lock:
+        conn = _get_disk_cache()
+        if conn is None:
+            return
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, content, created) VALUES (?, ?, ?)",
+            (key, content, time.time())
+        )
+        conn.commit()
+
+async def _cache_lookup(key: str) -> Optional[str]:
+    """Look a response up in memory, then in the persistent cache"""
+    content = _llm_cache_get(key)
+    if content is None and LLM_CACHE_DB:
+        try:
+            content = await asyncio.to_thread(_disk_cache_get, key)
+        except sqlite3.Error as e:
+            logger.warning(f"LLM disk cache read failed: {str(e)}")
+        if content is not None:
+            logger.debug("LLM disk cache hit")
+            _llm_cache_put(key, content)
+    return content
+
+async def _cache_store(key: str, content: str):
+    """Store a response in memory and in the persistent cache"""
+    _llm_cache_put(key, content)
+    if LLM_CACHE_DB:
+        try:
+            await asyncio.to_thread(_disk_cache_put, key, content)
+        except sqlite3.Error as e:
+            logger.warning(f"LLM disk cache write failed: {str(e)}")
+
+def _unregister_inflight(inflight: Dict[Any, List], key: Any, entry: List, _task: Optional[asyncio.Future] = None):
+    """Remove entry from the in-flight map unless a newer request has replaced it"""
+    if inflight.get(key) is entry:
+        del inflight[key]
+
+async def join_inflight(inflight: Dict[Any, List], key: Any, start: Callable[[], Awaitable[Any]]) -> Any:
+    """Await the shared task for key, starting it if none is in flight; cancel it once no caller waits"""
+    while True:
+        entry = inflight.get(key)
+        if entry is None:
+            task = asyncio.ensure_future(start())
+            entry = inflight[key] = [task, 0]
+            task.add_done_callback(functools.partial(_unregister_inflight, inflight, key, entry))
+        else:
+            logger.debug("Joining in-flight request")
+        task = entry[0]
+        entry[1] += 1
+        try:
+            # Shield the shared task so one cancelled caller does not cancel the others
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # The shared work was cancelled by its owner (e.g. an abandoned stream), not this caller:
+            # start or join a fresh request instead of failing
+            if task.cancelled() and not asyncio.current_task().cancelling():
+                logger.debug("Joined request was cancelled by its owner, retrying")
+                continue
+            raise
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and not task.done():
+                # Unregister first, so a caller arriving now starts afresh instead of joining a cancelled task
+                _unregister_inflight(inflight, key, entry)
+                task.cancel()
+
+# LLM calls in progress, keyed like the response cache
+_llm_inflight: Dict[str, List] = {}
+
+async def _invoke_and_cache(messages: List[BaseMessage], chat_model: ChatOllama, key: str) -> str:
+    """Invoke the LLM and store the response text under key"""
+    response = await robust_ainvoke(messages, chat_model)
+    await _cache_store(key, response.content)
+    return response.content
+
+async def cached_ainvoke(messages: List[BaseMessage], chat_model: ChatOllama = llm) -> str:
+    """Invoke the LLM and return the response text, reusing responses to identical prompts"""
+    key = _llm_cache_key(messages, chat_model)
+    content = await _cache_lookup(key)
+    if content is not None:
+        return content
+    
+    # Identical prompts issued concurrently share a single LLM call
+    return await join_inflight(_llm_inflight, key, lambda: _invoke_and_cache(messages, chat_model, key))
+
+async def _stream_chunks(messages: List[BaseMessage], chat_model: ChatOllama, timeout: float) -> AsyncIterator[str]:
+    """Stream the LLM response text, failing if the server sends nothing for timeout seconds"""
+    stream = chat_model.astream(messages).__aiter__()
+    try:
+        while True:
+            # Only the wait for the next chunk is timed, never the caller's work between chunks
+            try:
+                async with asyncio.timeout(timeout):
+                    chunk = await anext(stream)
+            except StopAsyncIteration:
+                return
+            yield chunk.content
+    finally:
+        await stream.aclose()
+
+async def cached_astream(messages: List[BaseMessage], chat_model: ChatOllama = llm,
+                         timeout: float = LLM_TIMEOUT) -> AsyncIterator[str]:
+    """Stream the LLM response text as it is generated, caching the full text"""
+    key = _llm_cache_key(messages, chat_model)
+    content = await _cache_lookup(key)
+    if content is not None:
+        yield content
+        return
+    
+    # An identical call is already running; wait for its full text instead of asking the server twice
+    if key in _llm_inflight:
+        yield await join_inflight(_llm_inflight, key, lambda: _invoke_and_cache(messages, chat_model, key))
+        return
+    
+    # Register this stream so identical calls made meanwhile join it
+    shared = asyncio.get_running_loop().create_future()
+    entry = _llm_inflight[key] = [shared, 0]
+    try:
+        # A failed stream can only be retried before any of it has been passed on
+        for attempt in range(LLM_MAX_RETRIES):
+            chunks = []
+            try:
+                async with _llm_limiter:
+                    async for chunk in _stream_chunks(messages, chat_model, timeout):
+                        chunks.append(chunk)
+                        yield chunk
+                break
+            except Exception as e:
+                if chunks or not is_transient_error(e) or attempt == LLM_MAX_RETRIES - 1:
+                    raise
+                delay = 2 ** attempt
+                logger.warning(f"LLM stream failed ({type(e).__name__}: {str(e)}), retrying in {delay}s")
+                await asyncio.sleep(delay)
+        content = "".join(chunks)
+        await _cache_store(key, content)
+        if not shared.done():
+            shared.set_result(content)
+    except BaseException as e:
+        if not shared.done():
+            if isinstance(e, Exception):
+                shared.set_exception(e)
+                # Joined callers see the error; nobody else needs to
+                shared.exception()
+            else:
+                shared.cancel()
+        raise
+    finally:
+        if _llm_inflight.get(key) is entry:
+            del _llm_inflight[key]
+
+async def cached_astream_lines(messages: List[BaseMessage]) -> AsyncIterator[str]:
+    """Stream the LLM response line by line as it is generated, caching the full text"""
+    pending = ""
+    async for chunk in cached_astream(messages):
+        pending += chunk
+        *lines, pending = pending.split('\n')
+        for line in lines:
+            yield line
+    yield pending
+
+async def stream_text(messages: List[BaseMessage], chat_model: ChatOllama = llm,
+                      on_delta: Optional[Callable[[str], Awaitable[None]]] = None) -> str:
+    """Return the full LLM response, passing each chunk to on_delta as it arrives"""
+    if on_delta is None:
+        return await cached_ainvoke(messages, chat_model)
+    parts = []
+    async for chunk in cached_astream(messages, chat_model):
+        parts.append(chunk)
+        await on_delta(chunk)
+    return "".join(parts)
+
 class CourseState(TypedDict):
     """Represents the current state of course generation"""
     topic: str
@@ -53,8 +485,8 @@ class CourseState(TypedDict):
     errors: List[str]
     status: str  # Add status field for progress updates
 
-class AgentState(TypedDict):
-    """State type for the course generation workflow"""
+class AgentState(TypedDict, total=False):
+    """State for the course generation pipeline; one dict is mutated in place by every step"""
     topic: str
     language: str
     current_stage: str
@@ -66,14 +498,15 @@ class AgentState(TypedDict):
     modules: Optional[List[Dict]]
     course: Optional[Dict]
 
-# Global state management
-_current_state = None
+# Per-context state management; each asyncio task sees its own value, so
+# concurrent generations never share or race on the same state dict
+_state_var: ContextVar[Optional[Dict]] = ContextVar("course_state", default=None)
 
 def get_current_state() -> Dict:
     """Get the current state of course generation"""
-    global _current_state
-    if _current_state is None:
-        _current_state = {
+    state = _state_var.get()
+    if state is None:
+        state = {
             "topic": "",
             "language": "",
             "current_stage": "init",
@@ -87,17 +520,24 @@ def get_current_state() -> Dict:
             "errors": [],
             "status": "Initializing"
         }
-    return _current_state
+        _state_var.set(state)
+    return state
 
 def update_state(new_state: Dict):
     """Update the current state"""
-    global _current_state
-    _current_state = new_state
+    _state_var.set(new_state)
 
 def reset_state():
     """Reset the state to initial values"""
-    global _current_state
-    _current_state = None
+    _state_var.set(None)
+
+# Question types every assessment must include at least once
+REQUIRED_QUESTION_TYPES = frozenset({'multiple_choice', 'free_form'})
+
+# Minimum number of words in a section body ("several paragraphs")
+MIN_SECTION_WORDS = 100
+# A single whitespace-delimited word
+_WORD_RE = re.compile(r'\S+')
 
 # Define Pydantic models for validation
 class Section(BaseModel):
@@ -105,9 +545,12 @@ class Section(BaseModel):
     title: str
     content: str
 
-    @validator('content')
+    @field_validator('content')
+    @classmethod
     def validate_content(cls, v):
-        if not v or len(v.split()) < 100:  # Rough estimate for "several paragraphs"
+        # Stop counting once the minimum is reached instead of splitting the whole body
+        word_count = sum(1 for _ in itertools.islice(_WORD_RE.finditer(v or ''), MIN_SECTION_WORDS))
+        if word_count < MIN_SECTION_WORDS:
             raise ValueError('Content must contain several paragraphs of instructional text')
         return v
 
@@ -121,146 +564,267 @@ class Question(BaseModel):
 class Assessment(BaseModel):
     questions: List[Question]
 
-    @validator('questions')
+    @field_validator('questions')
+    @classmethod
     def validate_questions(cls, v):
         if len(v) != 10:
             raise ValueError('Each assessment must have exactly 10 questions')
         # Ensure we have a mix of multiple choice and free form
-        question_types = [q.type for q in v]
-        if 'multiple_choice' not in question_types or 'free_form' not in question_types:
-            raise ValueError('Assessment must include both multiple choice and free form questions')
+        missing = REQUIRED_QUESTION_TYPES - {q.type for q in v}
+        if missing:
+            raise ValueError(f"Assessment must include both multiple choice and free form questions (missing: {', '.join(sorted(missing))})")
         return v
 
 class Session(BaseModel):
     session_number: str
     title: str
     description: str
-    learning_objectives: List[str]
-    sections: List[Section]
+    # Length constraints are checked inside pydantic-core; Assessment already enforces the question count
+    learning_objectives: List[str] = Field(min_length=1)
+    sections: List[Section] = Field(min_length=1)
     assessment: Assessment
 
-    @validator('learning_objectives')
-    def validate_learning_objectives(cls, v):
-        if not v or len(v) < 1:
-            raise ValueError('At least one learning objective is required')
-        return v
-
-    @validator('sections')
-    def validate_sections(cls, v):
-        if not v or len(v) < 1:
-            raise ValueError('At least one section is required')
-        return v
-
-    @validator('assessment')
-    def validate_assessment(cls, v):
-        if not v.questions or len(v.questions) < 10:
-            raise ValueError('At least 10 assessment questions are required')
-        return v
-
 class Module(BaseModel):
     module_number: str
     title: str
     description: str
     objectives: List[str]
     exercises: List[str]
-    sessions: List[Session]
-
-    @validator('sessions')
-    def validate_sessions(cls, v):
-        if not v or len(v) < 1:
-            raise ValueError('At least one session is required')
-        return v
+    sessions: List[Session] = Field(min_length=1)
 
 class CoursePlan(BaseModel):
     title: str
     description: str
-    modules: List[Module]
-
-    @validator('modules')
-    def validate_modules(cls, v):
-        if not v or len(v) < 1:
-            raise ValueError('At least one module is required')
-        return v
+    modules: List[Module] = Field(min_length=1)
 
 def validate_course_plan(plan_dict: dict) -> dict:
     """Validate the course plan structure using Pydantic models"""
     try:
-        course_plan = CoursePlan(**plan_dict)
-        return course_plan.dict()
+        # One model_validate call walks the whole module/session/section tree in pydantic-core
+        return CoursePlan.model_validate(plan_dict).model_dump()
     except ValidationError as e:
         logger.error(f"Course plan validation failed: {str(e)}")
         raise ValueError(f"Invalid course plan structure: {str(e)}")
 
-def parse_module_outline(outline: str) -> List[Dict]:
-    """Parse the module outline into a structured format."""
-    modules = []
-    current_module = None
-    current_section = None  # Track current section (Title, Description, etc.)
+# Module header, e.g. "### Module 1: Introduction to Async Programming"
+_MODULE_HEADER_RE = re.compile(r'^#{1,3}\s*Module\s+(\d+)[:\.]\s*(.+)$')
+# Session number inside a session header, e.g. "Session 1.2"
+_SESSION_NUMBER_RE = re.compile(r'\d+(\.\d+)?')
+# Markdown header line inside generated session content, e.g. "## Key Concepts"
+_SECTION_HEADER_RE = re.compile(r'^[^\S\n]*(#+)(.*)$', re.MULTILINE)
+# Keywords in an outline section header (e.g. "#### Hands-on Exercise:") in priority order,
+# with the module field each one fills; a header containing several belongs to the first listed
+_OUTLINE_SECTIONS = (
+    ('title:', 'title'),
+    ('description', 'description'),
+    ('objectives', 'objectives'),
+    ('exercise', 'exercises'),
+)
+# Assessment line: a numbered question ("3. What is an event loop?") or its answer ("Correct answer: ...")
+_ASSESSMENT_LINE_RE = re.compile(r'(?P<question>\d+\.)|(?:correct )?answer:(?P<answer>.*)', re.IGNORECASE)
+# Session outline labels (lowercased) mapped to the session field they fill
+_SESSION_SECTION_KEYS = {
+    "description": "description",
+    "key concepts": "key_concepts",
+    "visual elements": "visual_elements",
+    "resources": "resources",
+}
+
+class ModuleOutlineParser:
+    """Incremental parser for the markdown module outline, fed one line at a time"""
     
-    for line in outline.split('\n'):
+    def __init__(self):
+        self.modules = []
+        self.current_module = None
+        self.current_section = None  # Track current section (Title, Description, etc.)
+        self.description_parts = []  # Joined into the module description when it ends
+    
+    def _flush_module(self) -> Optional[Dict]:
+        module = self.current_module
+        if module:
+            module["description"] = " ".join(self.description_parts)
+            self.modules.append(module)
+        self.current_module = None
+        self.description_parts = []
+        return module
+    
+    def feed(self, line: str) -> Optional[Dict]:
+        """Consume a single line of the outline, returning a module once its successor begins"""
         line = line.strip()
         if not line or line.startswith('**') or line.startswith('---'):
-            continue
+            return None
             
-        # Match module headers (e.g., "### Module 1: Introduction to Async Programming")
-        module_match = re.match(r'^#{1,3}\s*Module\s+(\d+)[:\.]\s*(.+)$', line)
-        if module_match:
-            if current_module:
-                modules.append(current_module)
-            current_module = {
-                "number": module_match.group(1),
-                "title": module_match.group(2).strip(),
-                "description": "",
-                "objectives": [],
-                "exercises": []
-            }
-            current_section = None
-            continue
-        
-        # Match section headers (e.g., "#### Title:", "#### Description and Key Points:")
-        if line.startswith('####'):
-            section_name = line.replace('#', '').strip().lower()
-            if 'title:' in section_name:
-                current_section = 'title'
-            elif 'description' in section_name:
-                current_section = 'description'
-            elif 'learning objectives' in section_name or 'objectives' in section_name:
-                current_section = 'objectives'
-            elif 'hands-on exercise' in section_name or 'exercise' in section_name:
-                current_section = 'exercises'
-            continue
+        # Only heading lines can start a module or a section
+        if line[0] == '#':
+            # Match module headers (e.g., "### Module 1: Introduction to Async Programming")
+            module_match = _MODULE_HEADER_RE.match(line)
+            if module_match:
+                completed = self._flush_module()
+                self.current_module = {
+                    "number": module_match.group(1),
+                    "title": module_match.group(2).strip(),
+                    "description": "",
+                    "objectives": [],
+                    "exercises": []
+                }
+                self.current_section = None
+                return completed
+            
+            # Match section headers (e.g., "#### Title:", "#### Description and Key Points:")
+            if line.startswith('####'):
+                header = line.lower()
+                for keyword, section in _OUTLINE_SECTIONS:
+                    if keyword in header:
+                        self.current_section = section
+                        break
+                return None
         
         # Process content based on current section
-        if current_module and current_section:
+        current_module = self.current_module
+        if current_module and self.current_section:
             # Clean up bullet points and other markdown
             content = line.lstrip('*+-• \t')
             if content:
-                if current_section == 'description':
-                    if current_module["description"]:
-                        current_module["description"] += " "
-                    current_module["description"] += content
-                elif current_section == 'objectives':
+                if self.current_section == 'description':
+                    self.description_parts.append(content)
+                elif self.current_section == 'objectives':
                     if content.startswith('Learning Objectives:'):
-                        continue
+                        return
                     current_module["objectives"].append(content)
-                elif current_section == 'exercises':
+                elif self.current_section == 'exercises':
                     current_module["exercises"].append(content)
     
-    # Add the last module
-    if current_module:
-        modules.append(current_module)
-    
-    logger.debug(f"Parsed {len(modules)} modules")
-    for module in modules:
-        logger.debug(f"Module {module['number']}: {module['title']}")
-        logger.debug(f"Description: {module['description']}")
-        logger.debug(f"Objectives: {module['objectives']}")
-        logger.debug(f"Exercises: {module['exercises']}")
+    def finish(self) -> List[Dict]:
+        """Flush the last module and return all parsed modules"""
+        # Add the last module
+        self._flush_module()
+        
+        modules = self.modules
+        logger.debug("Parsed %d modules", len(modules))
+        if logger.isEnabledFor(logging.DEBUG):
+            for module in modules:
+                logger.debug("Module %s: %s", module['number'], module['title'])
+                logger.debug("Description: %s", module['description'])
+                logger.debug("Objectives: %s", module['objectives'])
+                logger.debug("Exercises: %s", module['exercises'])
+        
+        return modules
+
+def prompt_schema(model: type[BaseModel]) -> str:
+    """Compact JSON schema of a response model for prompts, without pydantic's generated titles"""
+    def strip_titles(node):
+        if isinstance(node, dict):
+            return {key: strip_titles(value) for key, value in node.items()
+                    if not (key == "title" and isinstance(value, str))}
+        if isinstance(node, list):
+            return [strip_titles(item) for item in node]
+        return node
+    return orjson.dumps(strip_titles(model.model_json_schema())).decode()
+
+# Models frequently emit session numbers as JSON numbers
+SessionNumber = Annotated[str, BeforeValidator(lambda v: str(v) if isinstance(v, (int, float)) else v)]
+
+# Structured response expected from the module content prompt (JSON mode)
+class SubsectionDraft(BaseModel):
+    title: str
+    content: str = ""
+
+class SectionDraft(BaseModel):
+    title: str
+    content: str = ""
+    subsections: List[SubsectionDraft] = []
+
+class SessionOutline(BaseModel):
+    session_number: SessionNumber
+    title: str
+    description: str = ""
+    key_concepts: List[str] = []
+    visual_elements: List[str] = []
+    resources: List[str] = []
+
+class ModuleContentResponse(BaseModel):
+    sections: List[SectionDraft]
+    sessions: List[SessionOutline]
+
+MODULE_CONTENT_SCHEMA = prompt_schema(ModuleContentResponse)
+
+# Structured response expected from the batched per-module assessment prompt (JSON mode)
+class SessionAssessmentDraft(BaseModel):
+    session_number: SessionNumber
+    questions: List[str]
+    answers: List[str] = []
+
+class ModuleAssessmentsResponse(BaseModel):
+    assessments: List[SessionAssessmentDraft]
+
+MODULE_ASSESSMENTS_SCHEMA = prompt_schema(ModuleAssessmentsResponse)
+
+# Structured response expected from the fused session content + assessment prompt (JSON mode)
+class SessionContentResponse(BaseModel):
+    content: str
+    questions: List[str]
+    answers: List[str] = []
+
+SESSION_CONTENT_SCHEMA = prompt_schema(SessionContentResponse)
+
+# Structured response expected from the batched per-session section prompt (JSON mode)
+class SectionContentDraft(BaseModel):
+    section_number: str
+    content: str
     
-    return modules
+    @field_validator('section_number', mode='before')
+    @classmethod
+    def normalize_section_number(cls, v):
+        # Models return 1, "1.1.1 " or "Section 1.1.1."; normalize so the lookup by number hits
+        v = str(v).strip()
+        if v[:7].lower() == 'section':
+            v = v[7:].strip()
+        return v.rstrip('.')
+
+class SessionSectionsResponse(BaseModel):
+    sections: List[SectionContentDraft]
+
+SESSION_SECTIONS_SCHEMA = prompt_schema(SessionSectionsResponse)
+
+def parse_module_outline(outline: str) -> List[Dict]:
+    """Parse the module outline into a structured format."""
+    parser = ModuleOutlineParser()
+    for line in outline.split('\n'):
+        parser.feed(line)
+    return parser.finish()
+
+# Outline generations in progress, shared by concurrent requests for the same topic
+_outline_inflight: Dict[Tuple[str, str], List] = {}
 
 async def create_course_outline(topic: str, language: str = "English") -> Dict[str, Any]:
+    """Create a course outline, joining an identical request that is already in flight"""
+    outline = await join_inflight(
+        _outline_inflight, (topic, language), lambda: _create_course_outline(topic, language)
+    )
+    return copy.deepcopy(outline)
+
+async def _create_course_outline(topic: str, language: str) -> Dict[str, Any]:
     """Create a high-level course outline with modules and prerequisites"""
+    try:
+        modules = [module async for module in stream_course_outline_modules(topic, language)]
+        return build_course_outline(topic, language, modules)
+        
+    except Exception as e:
+        logger.error(f"Error creating course outline: {str(e)}", exc_info=True)
+        raise
+
+def build_course_outline(topic: str, language: str, modules: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Wrap the parsed outline modules into the course outline structure"""
+    return {
+        "topic": topic,
+        "language": language,
+        "description": f"A comprehensive course on {topic}",
+        "prerequisites": [],  # Can be enhanced later
+        "modules": modules
+    }
+
+async def stream_course_outline_modules(topic: str, language: str) -> AsyncGenerator[Dict[str, Any], None]:
+    """Yield each outline module as soon as the LLM has finished writing it"""
     try:
         # Create the outline prompt
         outline_prompt = f"""
@@ -283,46 +847,31 @@ async def create_course_outline(topic: str, language: str = "English") -> Dict[s
         #### Hands-on Exercise:
         [Description of a practical exercise that applies the module's concepts]
         
-        Make sure each module includes:
-        1. A clear, numbered title (1-5 only)
-        2. A descriptive subtitle
-        3. A comprehensive description
-        4. 3-5 specific learning objectives
-        5. A hands-on exercise
-        
-        Important: Create no more than 5 modules total.
+        Give each module 3-5 specific learning objectives.
         """
         
         # Get response from LLM
         messages = [
-            SystemMessage(content="""You are an expert curriculum designer specializing in creating focused, structured learning content.
-            Always create between 3-5 modules total, no more and no less."""),
-            HumanMessage(content=outline_prompt)
+            OUTLINE_SYSTEM_MESSAGE,
+            HumanMessage(content=compact_prompt(outline_prompt))
         ]
         
-        response = await llm.ainvoke(messages)
-        logger.debug(f"LLM Response for course outline: {response.content}")
-        
-        # Parse the outline into a structured format
-        modules = parse_module_outline(response.content)
+        # Parse the outline while it is being generated; a module is complete once the next header arrives.
+        # The stream is drained even past the module limit so the full response still gets cached.
+        parser = ModuleOutlineParser()
+        async for line in cached_astream_lines(messages):
+            module = parser.feed(line)
+            if module and len(parser.modules) <= 5:
+                yield module
+        modules = parser.finish()
         
         if len(modules) > 5:
             logger.warning(f"Got {len(modules)} modules, truncating to 5")
-            modules = modules[:5]
-        
-        # Create the course outline
-        course_outline = {
-            "topic": topic,
-            "language": language,
-            "description": f"A comprehensive course on {topic}",
-            "prerequisites": [],  # Can be enhanced later
-            "modules": modules
-        }
-        
-        return course_outline
+        elif modules:
+            yield modules[-1]
         
     except Exception as e:
-        logger.error(f"Error creating course outline: {str(e)}", exc_info=True)
+        logger.error(f"Error streaming course outline: {str(e)}", exc_info=True)
         raise
 
 async def create_course_plan(topic: str, language: str = "English") -> Dict[str, Any]:
@@ -330,33 +879,15 @@ async def create_course_plan(topic: str, language: str = "English") -> Dict[str,
     try:
         logger.info(f"Creating course plan for topic: {topic}")
         
-        # Get the course outline
-        course_outline = await create_course_outline(topic, language)
-        logger.debug(f"Course outline: {course_outline}")
-        
         # Initialize course structure
-        course_plan = {
-            "topic": topic,
-            "language": language,
-            "description": course_outline.get("description", ""),
-            "prerequisites": course_outline.get("prerequisites", []),
-            "modules": []
-        }
+        course_plan = build_course_outline(topic, language, [])
         
-        # Process each module
-        for module in course_outline.get("modules", []):
-            logger.debug(f"Processing module: {module}")
-            
-            # Generate detailed module content
-            module_content = await create_module_content(
-                module_info=module,
-                language=language
-            )
-            
-            # Add module to course plan
+        async for module_content in stream_course_plan_modules(topic, language):
             course_plan["modules"].append(module_content)
-            
-            logger.debug(f"Added module {module['number']} to course plan")
+            logger.debug("Added module %s to course plan", module_content['module_number'])
+        
+        # Modules arrive in completion order; restore the outline order
+        course_plan["modules"].sort(key=lambda module: int(module["module_number"]))
         
         return course_plan
         
@@ -364,14 +895,54 @@ async def create_course_plan(topic: str, language: str = "English") -> Dict[str,
         logger.error(f"Error in create_course_plan: {str(e)}", exc_info=True)
         raise
 
+async def stream_course_plan_modules(topic: str, language: str = "English") -> AsyncGenerator[Dict[str, Any], None]:
+    """Yield each module's content as soon as it is generated, in completion order"""
+    finished = asyncio.Queue()
+    tasks = []
+    yielded = 0
+    
+    def collect(module: Dict[str, Any], task: asyncio.Task):
+        # Every finished task is queued, even a cancelled one, so drain() can count it
+        finished.put_nowait((module, task))
+    
+    async def drain(block: bool) -> AsyncGenerator[Dict[str, Any], None]:
+        nonlocal yielded
+        while yielded < len(tasks) and (block or not finished.empty()):
+            module, task = await finished.get()
+            yielded += 1
+            if task.cancelled():
+                logger.error(f"Skipping module {module['number']}: generation was cancelled")
+                continue
+            if task.exception() is not None:
+                logger.error(f"Skipping module {module['number']}: {str(task.exception())}")
+                continue
+            yield task.result()
+    
+    try:
+        # Start each module's content as soon as the outline stream completes it,
+        # while the remaining modules are still being generated
+        async for module in stream_course_outline_modules(topic, language):
+            logger.debug("Outline module %s ready", module['number'])
+            task = asyncio.ensure_future(create_module_content(module_info=module, language=language))
+            task.add_done_callback(functools.partial(collect, module))
+            tasks.append(task)
+            async for module_content in drain(block=False):
+                yield module_content
+        
+        async for module_content in drain(block=True):
+            yield module_content
+    finally:
+        for task in tasks:
+            task.cancel()
+
 async def create_module_content(module_info: Dict[str, Any], language: str) -> Dict[str, Any]:
     """Generate detailed content for a module"""
     try:
-        logger.debug(f"Creating content for module: {module_info.get('title', '')}")
+        logger.debug("Creating content for module: %s", module_info.get('title', ''))
         
-        # Create the module prompt
+        # Create a single prompt covering both the module content and its session outline
         module_prompt = f"""
-        Create detailed content for Module: {module_info['title']}
+        Create detailed content and a session outline for Module: {module_info['title']}
         Language: {language}
         
         Description: {module_info['description']}
@@ -379,62 +950,39 @@ async def create_module_content(module_info: Dict[str, Any], language: str) -> D
         Learning Objectives:
         {chr(10).join(f"- {obj}" for obj in module_info['objectives'])}
         
-        Create the following:
+        In "sections", create the following, each as a section with markdown content:
         1. Detailed module overview
         2. Key concepts (3-5 main points)
         3. Learning path recommendations
-        4. Session breakdown (2-3 sessions)
-        5. Practical exercises
-        
-        For each session, include:
-        - Clear title that reflects the content
-        - Brief description of what will be covered
-        - Learning objectives for that session
+        4. Practical exercises
         
-        Format the content using markdown with clear section headers.
         Make the content engaging, clear, and focused on practical understanding.
-        """
-        
-        # Get response from LLM
-        messages = [
-            SystemMessage(content="""You are an expert educator creating focused, practical learning content.
-            Create content that is clear, engaging, and builds understanding step by step.
-            Use markdown formatting for better readability."""),
-            HumanMessage(content=module_prompt)
-        ]
-        
-        response = await llm.ainvoke(messages)
-        logger.debug(f"LLM Response for module content: {response.content}")
-        
-        # Parse the content
-        sections = parse_section_content(response.content)
-        
-        # Create session outlines
-        session_prompt = f"""
-        Create 2-3 focused sessions for the module: {module_info['title']}
-        Language: {language}
         
+        In "sessions", create 2-3 focused sessions that build on each other.
         For each session, provide:
         1. Session number and title
         2. Clear description of content
-        3. Learning objectives (2-3 specific objectives)
-        4. Estimated duration
+        3. Key concepts and learning objectives (2-3 specific objectives)
         
-        Format as a structured list that can be easily parsed.
+        Return ONLY JSON matching this schema:
+        {MODULE_CONTENT_SCHEMA}
         """
         
+        # Get response from LLM
         messages = [
-            SystemMessage(content="""You are an expert in curriculum design.
-            Create focused, achievable learning sessions that build on each other.
-            Keep the content practical and engaging."""),
-            HumanMessage(content=session_prompt)
+            MODULE_CONTENT_SYSTEM_MESSAGE,
+            HumanMessage(content=compact_prompt(module_prompt))
         ]
         
-        session_response = await llm.ainvoke(messages)
-        logger.debug(f"LLM Response for session outline: {session_response.content}")
+        response = await cached_ainvoke(messages, json_llm)
+        logger.debug("LLM Response for module content: %s", response)
         
-        # Parse session outlines
-        sessions = parse_session_outline(session_response.content)
+        try:
+            parsed = ModuleContentResponse.model_validate_json(response)
+        except ValidationError as e:
+            raise ValueError(f"Invalid module content response: {str(e)}")
+        sections = [section.model_dump() for section in parsed.sections]
+        sessions = [session.model_dump() for session in parsed.sessions]
         
         # Format the module content
         module_content = {
@@ -452,20 +1000,21 @@ async def create_module_content(module_info: Dict[str, Any], language: str) -> D
         logger.error(f"Error creating module content: {str(e)}", exc_info=True)
         raise
 
-async def create_session_content(module_number: str, session_number: str, title: str, language: str) -> Dict:
-    """Generate content for a session"""
+async def create_session_content(module_number: str, session_number: str, title: str, language: str,
+                                 include_assessment: bool = True) -> Dict:
+    """Generate content for a session, optionally with its assessment"""
     try:
         # Update state to indicate session generation
-        state = get_current_state()
-        state["current_stage"] = "session_generation"
+        # (copied, since tasks spawned from one context share the parent's dict)
+        state = {**get_current_state(), "current_stage": "session_generation"}
         update_state(state)
         
-        logger.debug(f"Requesting content for session {session_number} in module {module_number}")
+        logger.debug("Requesting content for session %s in module %s", session_number, module_number)
         
-        # Create the session prompt
-        session_prompt = f"""
-        Create detailed content for Session {session_number} of Module {module_number}: {title}
-        Language: {language}
+        # Create the session prompt. The instructions are identical for every session and come first,
+        # so the server can reuse the cached prompt prefix; only the trailing details vary.
+        session_prompt = """
+        Create detailed content for the session described at the end of this message.
         
         Include the following sections:
         1. Introduction and Overview
@@ -478,66 +1027,131 @@ async def create_session_content(module_number: str, session_number: str, title:
         Format the content using markdown with clear section headers.
         Make the content engaging, clear, and focused on practical understanding.
         """
+        session_details = f"""
+        Session {session_number} of Module {module_number}: {title}
+        Language: {language}
+        """
         
-        # Get response from LLM
+        # Request the content and its assessment together in one JSON call
+        if include_assessment:
+            fused_prompt = f"""{session_prompt}
+            Put the full markdown content in "content".
+            
+            Also create an assessment for this session with 5 questions that test understanding
+            of the key concepts. Include a mix of:
+            - Multiple choice questions
+            - Short answer questions
+            - Practical application questions
+            
+            Put the question texts in "questions" and, in the matching position of "answers",
+            the correct answer with a brief explanation of why it's correct.
+            
+            Return ONLY JSON matching this schema:
+            {SESSION_CONTENT_SCHEMA}
+            {session_details}"""
+            
+            messages = [
+                SESSION_WITH_ASSESSMENT_SYSTEM_MESSAGE,
+                HumanMessage(content=compact_prompt(fused_prompt))
+            ]
+            
+            response = await cached_ainvoke(messages, json_llm)
+            logger.debug("LLM Response for session content: %s", response)
+            
+            try:
+                parsed = SessionContentResponse.model_validate_json(response)
+            except ValidationError as e:
+                raise ValueError(f"Invalid session content response: {str(e)}")
+            
+            return {
+                "session_number": session_number,
+                "title": title,
+                "module_number": module_number,
+                "language": language,
+                "sections": parse_section_content(parsed.content),
+                "assessment": {
+                    "questions": parsed.questions,
+                    "answers": parsed.answers
+                }
+            }
+        
+        # Callers generating a whole module batch assessments via create_module_assessments
+        # only need the content
         messages = [
-            SystemMessage(content="""You are an expert educator creating focused, practical learning content.
-            Create content that is clear, engaging, and builds understanding step by step.
-            Use markdown formatting for better readability."""),
-            HumanMessage(content=session_prompt)
+            CONTENT_SYSTEM_MESSAGE,
+            HumanMessage(content=compact_prompt(session_prompt + session_details))
         ]
         
-        response = await llm.ainvoke(messages)
-        logger.debug(f"LLM Response for session content: {response.content}")
+        response = await cached_ainvoke(messages)
+        logger.debug("LLM Response for session content: %s", response)
         
-        # Parse the content
-        sections = parse_section_content(response.content)
+        return {
+            "session_number": session_number,
+            "title": title,
+            "module_number": module_number,
+            "language": language,
+            "sections": parse_section_content(response)
+        }
         
-        # Create assessment for the session
+    except Exception as e:
+        logger.error(f"Error creating session content: {str(e)}", exc_info=True)
+        raise
+
+async def create_module_assessments(module_number: str, sessions: List[Dict], language: str) -> Dict[str, Dict]:
+    """Generate the assessments for all sessions of a module in a single LLM call"""
+    try:
+        session_list = "\n".join(
+            f"        - Session {session['session_number']}: {session['title']}" for session in sessions
+        )
         assessment_prompt = f"""
-        Create an assessment for Session {session_number} of Module {module_number}: {title}
+        Create an assessment for each of the following sessions of Module {module_number}
         Language: {language}
         
-        Create 5 questions that test understanding of the key concepts.
+        Sessions:
+{session_list}
+        
+        For each session, create 5 questions that test understanding of its key concepts.
         Include a mix of:
         - Multiple choice questions
         - Short answer questions
         - Practical application questions
         
-        For each question, provide:
-        1. The question text
-        2. The correct answer
-        3. Explanation of why it's correct
-
-        Do not include any other content other than the questions and answers.
+        For each question, provide the question text, and in the matching position of
+        "answers", the correct answer with a brief explanation of why it's correct.
+        
+        Return ONLY JSON matching this schema:
+        {MODULE_ASSESSMENTS_SCHEMA}
         """
         
         messages = [
-            SystemMessage(content="""You are an expert in creating effective assessments.
-            Create questions that test both understanding and practical application.
-            Make questions clear and unambiguous."""),
-            HumanMessage(content=assessment_prompt)
+            ASSESSMENT_JSON_SYSTEM_MESSAGE,
+            HumanMessage(content=compact_prompt(assessment_prompt))
         ]
         
-        assessment_response = await llm.ainvoke(messages)
-        logger.debug(f"LLM Response for assessment: {assessment_response.content}")
-        
-        # Format the session content
-        session_content = {
-            "session_number": session_number,
-            "title": title,
-            "module_number": module_number,
-            "language": language,
-            "sections": sections,
-            "assessment": {
-                "questions": parse_assessment_content(assessment_response.content)
+        response = await cached_ainvoke(messages, json_llm)
+        logger.debug("LLM Response for module assessments: %s", response)
+        
+        try:
+            drafts = ModuleAssessmentsResponse.model_validate_json(response).assessments
+        except ValidationError as e:
+            raise ValueError(f"Invalid module assessments response: {str(e)}")
+        
+        # Match assessments to sessions by number, falling back to position
+        by_number = {draft.session_number: draft for draft in drafts}
+        assessments = {}
+        for index, session in enumerate(sessions):
+            draft = by_number.get(session["session_number"])
+            if draft is None and index < len(drafts):
+                draft = drafts[index]
+            assessments[session["session_number"]] = {
+                "questions": draft.questions if draft else [],
+                "answers": draft.answers if draft else []
             }
-        }
         
-        return session_content
+        return assessments
         
     except Exception as e:
-        logger.error(f"Error creating session content: {str(e)}", exc_info=True)
+        logger.error(f"Error creating module assessments: {str(e)}", exc_info=True)
         raise
 
 def parse_section_content(content: str) -> List[Dict[str, Any]]:
@@ -545,47 +1159,40 @@ def parse_section_content(content: str) -> List[Dict[str, Any]]:
     try:
         sections = []
         current_section = None
-        current_list = []
-        
-        for line in content.split('\n'):
-            line = line.strip()
-            if not line:
-                continue
+        section_level = None  # Header depth of top-level sections (set by the first header)
+        
+        # Split the whole document at header lines; text before the first header is dropped
+        headers = list(_SECTION_HEADER_RE.finditer(content))
+        ends = [match.start() for match in headers[1:]] + [len(content)]
+        for match, end in zip(headers, ends):
+            header_level = len(match.group(1))
+            body = content[match.end():end]
+            target = {
+                'title': match.group(2).strip(),
+                'content': '\n'.join(filter(None, map(str.strip, body.split('\n'))))
+            }
+            
+            if section_level is None:
+                section_level = header_level
             
             # Check for section headers (markdown style)
-            if line.startswith('#'):
+            if current_section is None or header_level <= section_level:
                 if current_section:
-                    current_section['content'] = '\n'.join(current_list)
                     sections.append(current_section)
-                    current_list = []
                 
                 # Create new section
-                current_section = {
-                    'title': line.lstrip('#').strip(),
-                    'content': '',
-                    'subsections': []
-                }
+                target['subsections'] = []
+                current_section = target
             
-            # Check for subsection headers
-            elif line.startswith('##'):
-                if current_list:
-                    if current_section:
-                        current_section['subsections'].append({
-                            'title': line.lstrip('#').strip(),
-                            'content': '\n'.join(current_list)
-                        })
-                    current_list = []
-            
-            # Add line to current content
+            # Deeper headers start a subsection of the current section
             else:
-                current_list.append(line)
+                current_section['subsections'].append(target)
         
         # Add the last section
-        if current_section and current_list:
-            current_section['content'] = '\n'.join(current_list)
+        if current_section:
             sections.append(current_section)
         
-        logger.debug(f"Parsed {len(sections)} sections")
+        logger.debug("Parsed %d sections", len(sections))
         return sections
         
     except Exception as e:
@@ -619,7 +1226,7 @@ def parse_session_outline(outline: str) -> List[Dict]:
                     title = parts[1].strip()
                     
                     # Extract session number
-                    number_match = re.search(r'\d+(\.\d+)?', session_info)
+                    number_match = _SESSION_NUMBER_RE.search(session_info)
                     if number_match:
                         session_number = number_match.group(0)
                     else:
@@ -636,39 +1243,29 @@ def parse_session_outline(outline: str) -> List[Dict]:
                     current_section = None
             
             elif current_session and line.startswith("* "):
-                # Identify which section we're in
-                if "Description:" in line:
-                    current_section = "description"
-                    current_session["description"] = line.split("Description:", 1)[1].strip()
-                elif "Key Concepts:" in line:
-                    current_section = "key_concepts"
-                elif "Visual Elements:" in line:
-                    current_section = "visual_elements"
-                elif "Resources:" in line:
-                    current_section = "resources"
+                # Identify which section we're in from the label before the colon
+                head, _, rest = line.partition(":")
+                section = _SESSION_SECTION_KEYS.get(head.strip("* \t").lower())
+                if section:
+                    current_section = section
+                    if section == "description":
+                        current_session["description"] = rest.strip("* \t")
             
-            elif current_session and current_section and line.startswith(("+", "-", "\t+")):
-                # Clean up the line content
-                line_content = line.strip("+-\t").strip()
-                
-                # Add to appropriate section
-                if current_section == "key_concepts":
-                    current_session["key_concepts"].append(line_content)
-                elif current_section == "visual_elements":
-                    current_session["visual_elements"].append(line_content)
-                elif current_section == "resources":
-                    current_session["resources"].append(line_content)
+            elif current_session and current_section and line.startswith(("+", "-")):
+                # Bullets belong to the current list section; description has none
+                if current_section != "description":
+                    current_session[current_section].append(line.strip("+-\t").strip())
         
         # Add the last session
         if current_session and current_session.get("title"):
             sessions.append(current_session)
         
-        num_sessions = len(sessions)
-        logger.info(f"Successfully parsed {num_sessions} sessions")
+        logger.info("Successfully parsed %d sessions", len(sessions))
         
         # Log session details
-        session_details = [f"{s['session_number']}: {s['title']}" for s in sessions]
-        logger.debug(f"Session details: {session_details}")
+        if logger.isEnabledFor(logging.DEBUG):
+            session_details = [f"{s['session_number']}: {s['title']}" for s in sessions]
+            logger.debug("Session details: %s", session_details)
         
         return sessions
         
@@ -676,45 +1273,7 @@ def parse_session_outline(outline: str) -> List[Dict]:
         logger.error(f"Error parsing session outline: {str(e)}", exc_info=True)
         raise
 
-def should_continue(state: Dict) -> str:
-    """Determine the next step in the workflow based on current state"""
-    try:
-        # Check if we've reached max retries
-        if state.get("retries", 0) >= 5:
-            logger.warning("Max retries reached, ending workflow")
-            return "end"
-            
-        # Check for error state
-        if state.get("error"):
-            logger.error(f"Error detected: {state['error']}")
-            return "end"
-            
-        # Check completion status
-        if state.get("completed"):
-            logger.info("Course generation completed successfully")
-            return "end"
-            
-        # Check current stage
-        current_stage = state.get("current_stage", "start")
-        
-        if current_stage == "start":
-            return "create_outline"
-        elif current_stage == "outline_created":
-            return "create_modules"
-        elif current_stage == "modules_created":
-            return "create_sessions"
-        elif current_stage == "sessions_created":
-            return "finalize"
-        else:
-            logger.warning(f"Unknown stage: {current_stage}")
-            return "end"
-            
-    except Exception as e:
-        logger.error(f"Error in should_continue: {str(e)}", exc_info=True)
-        state["error"] = str(e)
-        return "end"
-
-async def create_initial_state(state: Dict) -> Dict:
+async def create_initial_state(state: AgentState) -> AgentState:
     """Create the initial state for course generation"""
     try:
         state.update({
@@ -730,7 +1289,7 @@ async def create_initial_state(state: Dict) -> Dict:
         state["error"] = str(e)
         return state
 
-async def create_course_outline_state(state: Dict) -> Dict:
+async def create_course_outline_state(state: AgentState) -> AgentState:
     """Create the course outline"""
     try:
         state["current_stage"] = "outline_creation"
@@ -746,56 +1305,95 @@ async def create_course_outline_state(state: Dict) -> Dict:
         state["error"] = str(e)
         return state
 
-async def create_module_content_state(state: Dict) -> Dict:
-    """Create content for all modules"""
-    try:
-        state["current_stage"] = "module_creation"
-        state["status"] = "Creating module content"
-        
-        modules = []
-        for module in state["course_outline"]["modules"]:
-            module_content = await create_module_content(
-                module_info=module,
-                language=state["language"]
+# Rough token costs used to refuse oversized generations before their sessions are requested
+SESSION_OUTPUT_TOKENS = 2000
+ASSESSMENT_OUTPUT_TOKENS = 600
+PROMPT_TOKENS = 300
+# Upper bound on the estimated tokens a single course may spend on its sessions
+MAX_COURSE_TOKENS = 150_000
+
+def estimate_session_tokens(modules: List[Dict], batched_assessments: bool = True) -> int:
+    """Estimate the tokens needed to generate every session and assessment of the given modules"""
+    session_count = sum(len(module.get("sessions", [])) for module in modules)
+    # One content call per session plus one assessment call per module, or per session when not batched
+    calls = session_count + (len(modules) if batched_assessments else session_count)
+    return session_count * (SESSION_OUTPUT_TOKENS + ASSESSMENT_OUTPUT_TOKENS) + calls * PROMPT_TOKENS
+
+def check_generation_budget(modules: List[Dict], batched_assessments: bool = True):
+    """Raise before more sessions are requested if the course would exceed MAX_COURSE_TOKENS"""
+    estimated = estimate_session_tokens(modules, batched_assessments)
+    if estimated > MAX_COURSE_TOKENS:
+        raise ValueError(
+            f"Course too large to generate: about {estimated:,} tokens estimated, limit is {MAX_COURSE_TOKENS:,}"
+        )
+    logger.info(f"Estimated {estimated:,} tokens for session generation")
+
+async def generate_module_sessions(module: Dict, language: str, semaphore: asyncio.Semaphore) -> Dict:
+    """Fill in every session of a module, with its batched assessment, in place"""
+    async def generate_session(session: Dict) -> Dict:
+        async with semaphore:
+            return await create_session_content(
+                module_number=module["module_number"],
+                session_number=session["session_number"],
+                title=session["title"],
+                language=language,
+                include_assessment=False
             )
-            modules.append(module_content)
-        
-        state["modules"] = modules
-        state["current_stage"] = "modules_created"
-        
-        return state
-    except Exception as e:
-        logger.error(f"Error in create_module_content_state: {str(e)}", exc_info=True)
-        state["error"] = str(e)
-        return state
+    
+    async def generate_assessments() -> Dict[str, Dict]:
+        async with semaphore:
+            return await create_module_assessments(
+                module_number=module["module_number"],
+                sessions=module["sessions"],
+                language=language
+            )
+    
+    # Assessments only need the session numbers and titles from the outline, so they run
+    # alongside the session content (one call per module); gather keeps session order
+    sessions, assessments = await asyncio.gather(
+        asyncio.gather(*(generate_session(session) for session in module["sessions"])),
+        generate_assessments()
+    )
+    for session in sessions:
+        session["assessment"] = assessments[session["session_number"]]
+    module["sessions"] = list(sessions)
+    return module
 
-async def create_session_content_state(state: Dict) -> Dict:
-    """Create content for all sessions in all modules"""
+async def create_course_content_state(state: AgentState) -> AgentState:
+    """Create every module, starting each module's sessions as soon as its own content is ready"""
     try:
-        state["current_stage"] = "session_creation"
-        state["status"] = "Creating session content"
-        
-        for module in state["modules"]:
-            sessions = []
-            for session in module["sessions"]:
-                session_content = await create_session_content(
-                    module_number=module["module_number"],
-                    session_number=session["session_number"],
-                    title=session["title"],
-                    language=state["language"]
-                )
-                sessions.append(session_content)
-            module["sessions"] = sessions
-        
+        state["current_stage"] = "module_creation"
+        state["status"] = "Creating module and session content"
+        
+        semaphore = asyncio.Semaphore(SESSION_CONCURRENCY)
+        # Modules whose session outlines are known, so the budget covers every session requested so far
+        planned = []
+        
+        async def build_module(module_info: Dict) -> Dict:
+            module = await create_module_content(module_info=module_info, language=state["language"])
+            planned.append(module)
+            check_generation_budget(planned)
+            return await generate_module_sessions(module, state["language"], semaphore)
+        
+        # One branch per module; modules are joined (in outline order) before finalizing
+        tasks = [asyncio.ensure_future(build_module(module)) for module in state["course_outline"]["modules"]]
+        try:
+            modules = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        
+        state["modules"] = list(modules)
         state["current_stage"] = "sessions_created"
         
         return state
     except Exception as e:
-        logger.error(f"Error in create_session_content_state: {str(e)}", exc_info=True)
+        logger.error(f"Error in create_course_content_state: {str(e)}", exc_info=True)
         state["error"] = str(e)
         return state
 
-async def finalize_course_state(state: Dict) -> Dict:
+async def finalize_course_state(state: AgentState) -> AgentState:
     """Finalize the course generation"""
     try:
         state["current_stage"] = "finalizing"
@@ -820,7 +1418,7 @@ async def finalize_course_state(state: Dict) -> Dict:
         state["error"] = str(e)
         return state
 
-def end_workflow(state: Dict) -> Dict:
+def end_workflow(state: AgentState) -> AgentState:
     """End the workflow and return final state"""
     try:
         if state.get("error"):
@@ -835,203 +1433,56 @@ def end_workflow(state: Dict) -> Dict:
         state["error"] = str(e)
         return state
 
-# Create the workflow
-workflow = StateGraph(AgentState)
-
-# Add nodes
-workflow.add_node("start", create_initial_state)
-workflow.add_node("create_outline", create_course_outline_state)
-workflow.add_node("create_modules", create_module_content_state)
-workflow.add_node("create_sessions", create_session_content_state)
-workflow.add_node("finalize", finalize_course_state)
-workflow.add_node("end", end_workflow)
-
-# Add edges with conditions
-workflow.add_conditional_edges(
-    "start",
-    should_continue,
-    {
-        "create_outline": "create_outline",
-        "end": "end"
-    }
+# Pipeline steps, run in order after create_initial_state
+PIPELINE_STEPS = (
+    create_course_outline_state,
+    create_course_content_state,
+    finalize_course_state,
 )
 
-workflow.add_conditional_edges(
-    "create_outline",
-    should_continue,
-    {
-        "create_modules": "create_modules",
-        "end": "end"
-    }
-)
-
-workflow.add_conditional_edges(
-    "create_modules",
-    should_continue,
-    {
-        "create_sessions": "create_sessions",
-        "end": "end"
-    }
-)
+async def run_pipeline(state: AgentState) -> AgentState:
+    """Run the course generation steps in order, stopping at the first error"""
+    state = await create_initial_state(state)
+    for step in PIPELINE_STEPS:
+        if state.get("error"):
+            logger.error(f"Error detected: {state['error']}")
+            break
+        state = await step(state)
+    return end_workflow(state)
 
-workflow.add_conditional_edges(
-    "create_sessions",
-    should_continue,
-    {
-        "finalize": "finalize",
-        "end": "end"
-    }
-)
+# Directory holding partially generated course plans, so an interrupted run can resume
+CHECKPOINT_DIR = "checkpoints"
 
-workflow.add_conditional_edges(
-    "finalize",
-    should_continue,
-    {
-        "end": "end"
-    }
-)
+def checkpoint_path(topic: str, language: str, course_plan: Dict) -> str:
+    """Path of the checkpoint file for a course plan, before any content was generated for it"""
+    # The plan is part of the key, so a run with a different plan never resumes a stale checkpoint
+    run_id = hashlib.sha256(
+        f"{topic}\0{language}\0".encode() + json_utils.dumps_compact(course_plan)
+    ).hexdigest()[:16]
+    return os.path.join(CHECKPOINT_DIR, f"{run_id}.json")
 
-# Set entry and exit points
-workflow.set_entry_point("start")
-workflow.set_finish_point("end")
+def load_checkpoint(path: str) -> Optional[Dict]:
+    """Load a saved course plan, or None if there is no usable checkpoint"""
+    try:
+        with open(path, 'rb') as f:
+            return json_utils.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable checkpoint {path}: {str(e)}")
+        return None
 
-# Compile the workflow
-app = workflow.compile()
+def save_checkpoint(path: str, course_plan: Dict):
+    """Atomically write the course plan to its checkpoint file"""
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    json_utils.write_atomic(path, json_utils.dumps_compact(course_plan))
 
-async def generate_course(topic: str, language: str = "English") -> AsyncGenerator[Dict[str, Any], None]:
-    """Generate a course with proper structure validation"""
+def remove_checkpoint(path: str):
+    """Delete a checkpoint once its course is complete"""
     try:
-        logger.info("Creating course outline...")
-        yield {"status": "📚 Creating course outline...", "progress": 10}
-        
-        # Generate initial outline
-        outline = await generate_course_outline(topic, language)
-        
-        # Initialize course structure
-        course = {
-            "topic": topic,
-            "language": language,
-            "description": outline.get("description", ""),
-            "prerequisites": outline.get("prerequisites", []),
-            "modules": []
-        }
-        
-        # Generate 2-3 modules
-        module_count = 3
-        module_titles = outline.get("modules", [])[:module_count]
-        
-        for module_idx in range(module_count):
-            module_title = module_titles[module_idx] if module_idx < len(module_titles) else f"Module {module_idx + 1}"
-            module = {
-                "title": module_title,
-                "description": outline.get("module_descriptions", {}).get(str(module_idx + 1), ""),
-                "sessions": []
-            }
-            
-            yield {
-                "status": f"📘 Generating Module {module_idx + 1}: {module_title}",
-                "progress": 20 + (module_idx * 20)
-            }
-            
-            # Generate 3-5 sessions per module
-            session_count = 4
-            for session_idx in range(session_count):
-                session_number = f"{module_idx + 1}.{session_idx + 1}"
-                
-                # Generate session content
-                session_content = await create_session_content(session_number, topic, language)
-                session_title = session_content.get("session_name", f"Session {session_number}")
-                
-                session = {
-                    "session_number": session_number,
-                    "title": session_title,
-                    "description": session_content.get("description", ""),
-                    "learning_objectives": session_content.get("learning_objectives", []),
-                    "sections": []
-                }
-                
-                yield {
-                    "status": f"📝 Generating Session {session_number}: {session_title}",
-                    "progress": 40 + int((module_idx * session_count + session_idx) / (module_count * session_count) * 30)
-                }
-                
-                # Add sections from session content
-                sections = session_content.get("sections", [])
-                # Ensure 2-4 sections per session
-                section_count = min(max(2, len(sections)), 4)
-                
-                for section_idx in range(section_count):
-                    section_number = f"{session_number}.{section_idx + 1}"
-                    section_data = sections[section_idx] if section_idx < len(sections) else {}
-                    
-                    # Generate section content if not present
-                    if not section_data.get("section_content"):
-                        section_prompt = f"""Create comprehensive content for section {section_number} of {session_title} about {topic} in {language}.
-                        This section should:
-                        1. Build on previous content
-                        2. Include clear explanations and examples
-                        3. Use markdown formatting for better readability
-                        4. Focus on practical understanding
-                        """
-                        section_content = await generate_section_content(section_prompt)
-                    else:
-                        section_content = section_data["section_content"]
-                    
-                    section_title = section_data.get("section_name", f"Section {section_number}")
-                    section = {
-                        "section_number": section_number,
-                        "title": section_title,
-                        "content": section_content,
-                        "examples": section_data.get("examples", []),
-                        "key_concepts": section_data.get("key_concepts", []),
-                        "references": section_data.get("references", [])
-                    }
-                    session["sections"].append(section)
-                    
-                    yield {
-                        "status": f"✍️ Generating Section {section_number}: {section_title}",
-                        "progress": 70 + int((module_idx * session_count * section_count + session_idx * section_count + section_idx) / (module_count * session_count * section_count) * 20)
-                    }
-                
-                # Generate assessment
-                yield {
-                    "status": f"📋 Creating assessment for Session {session_number}: {session_title}",
-                    "progress": 90 + int((module_idx * session_count + session_idx) / (module_count * session_count) * 10)
-                }
-                
-                session["assessment"] = await generate_session_assessment(
-                    session_number=session_number,
-                    topic=topic,
-                    language=language
-                )
-                
-                module["sessions"].append(session)
-            
-            course["modules"].append(module)
-        
-        # Validate final course structure
-        if not validate_course_structure(course):
-            logger.error("Course validation failed")
-            yield {
-                "status": "❌ Error: Course validation failed. Please try again.",
-                "progress": 100,
-                "error": "Failed to generate valid course structure"
-            }
-            return
-        
-        yield {
-            "status": "✅ Course generation complete!",
-            "progress": 100,
-            "course_state": course
-        }
-        
-    except Exception as e:
-        logger.error(f"Error generating course: {str(e)}")
-        yield {
-            "status": f"❌ Error generating course: {str(e)}",
-            "progress": 100,
-            "error": str(e)
-        }
+        os.remove(path)
+    except FileNotFoundError:
+        pass
 
 async def create_course_from_state(state: Dict) -> Dict:
     """Main function to create a course from the current state"""
@@ -1041,52 +1492,86 @@ async def create_course_from_state(state: Dict) -> Dict:
             logger.error("No course plan found in state")
             raise ValueError("No course plan found in state")
         
-        total_modules = len(state['course_plan']['modules'])
+        # Resume a previous interrupted run for the same topic, language and plan
+        path = checkpoint_path(state['topic'], state['language'], state['course_plan'])
+        checkpoint = await asyncio.to_thread(load_checkpoint, path)
+        if checkpoint and checkpoint.get('modules'):
+            logger.info(f"Resuming course generation from checkpoint {path}")
+            state['course_plan'] = checkpoint
+        
+        modules = state['course_plan']['modules']
+        total_modules = len(modules)
         state['total_modules'] = total_modules
+        check_generation_budget(modules)
         
-        # Process each module
-        for module_index in range(total_modules):
-            state['current_module_number'] = module_index
-            current_module = state['course_plan']['modules'][module_index]
-            
-            # Update status with module progress
-            status_msg = f"[Module {module_index + 1}/{total_modules}] Generating content for Module: {current_module.get('title', '')}"
+        errors_before = len(state['errors'])
+        module_semaphore = asyncio.Semaphore(MODULE_CONCURRENCY)
+        checkpoint_lock = asyncio.Lock()
+        
+        async def save_progress():
+            async with checkpoint_lock:
+                try:
+                    await asyncio.to_thread(save_checkpoint, path, state['course_plan'])
+                except OSError as e:
+                    logger.warning(f"Could not save checkpoint: {str(e)}")
+        
+        def report(status_msg: str):
             logger.info(status_msg)
             state['status'] = status_msg
-            
-            try:
-                # Generate module content
-                state = await generate_module_content(state)
+        
+        async def process_module(module_index: int, current_module: Dict):
+            async with module_semaphore:
+                label = f"[Module {module_index + 1}/{total_modules}]"
+                module_number = current_module.get('module_number', str(module_index + 1))
                 
-                # Process each session in the module
-                total_sessions = len(current_module.get('sessions', []))
-                state['total_sessions'] = total_sessions
+                # Update status with module progress
+                report(f"{label} Generating content for Module: {current_module.get('title', '')}")
                 
-                for session_index in range(total_sessions):
-                    state['current_session_number'] = session_index
-                    current_session = current_module['sessions'][session_index]
+                try:
+                    # Module content and session outlines come from create_course_plan;
+                    # generate every session of the module concurrently
+                    sessions = current_module.get('sessions', [])
+                    semaphore = asyncio.Semaphore(SESSION_CONCURRENCY)
                     
-                    # Update status with session progress
-                    status_msg = f"[Module {module_index + 1}/{total_modules}] Generating Session {session_index + 1}: {current_session.get('title', '')}"
-                    logger.info(status_msg)
-                    state['status'] = status_msg
+                    async def generate_session(session_index: int, session: Dict):
+                        async with semaphore:
+                            logger.info(f"{label} Generating Session {session_index + 1}: {session.get('title', '')}")
+                            result = await create_session_content(
+                                module_number=module_number,
+                                session_number=session['session_number'],
+                                title=session.get('title', ''),
+                                language=state['language']
+                            )
+                        session.update(result)
+                        await save_progress()
                     
-                    try:
-                        state = await generate_session_content(state)
-                    except Exception as e:
-                        logger.error(f"Error generating session {session_index + 1}: {str(e)}")
-                        state['errors'].append(f"Failed to generate session {session_index + 1}: {str(e)}")
-                        continue
-                
-                # Update status after completing the module
-                status_msg = f"[Module {module_index + 1}/{total_modules}] Completed module '{current_module['title']}'"
-                logger.info(status_msg)
-                state['status'] = status_msg
-                
-            except Exception as e:
-                logger.error(f"Error generating module {module_index + 1}: {str(e)}")
-                state['errors'].append(f"Failed to generate module {module_index + 1}: {str(e)}")
-                continue
+                    # Sessions restored from a checkpoint already have their sections
+                    pending = [(i, session) for i, session in enumerate(sessions) if 'sections' not in session]
+                    results = await asyncio.gather(
+                        *(generate_session(i, session) for i, session in pending),
+                        return_exceptions=True
+                    )
+                    
+                    for (session_index, _), result in zip(pending, results):
+                        if isinstance(result, Exception):
+                            logger.error(f"Error generating session {session_index + 1} of module {module_index + 1}: {str(result)}")
+                            state['errors'].append(f"Failed to generate session {session_index + 1} of module {module_index + 1}: {str(result)}")
+                    
+                    # Update status after completing the module
+                    report(f"{label} Completed module '{current_module['title']}'")
+                    
+                except Exception as e:
+                    logger.error(f"Error generating module {module_index + 1}: {str(e)}")
+                    state['errors'].append(f"Failed to generate module {module_index + 1}: {str(e)}")
+        
+        # Process all modules concurrently; the LLM semaphore caps the total in-flight calls
+        await asyncio.gather(*(
+            process_module(module_index, module) for module_index, module in enumerate(modules)
+        ))
+        
+        # Keep the checkpoint while anything failed, so a rerun only retries the gaps
+        if len(state['errors']) == errors_before:
+            await asyncio.to_thread(remove_checkpoint, path)
         
         # Create the final course structure
         course = {
@@ -1094,7 +1579,7 @@ async def create_course_from_state(state: Dict) -> Dict:
             "language": state["language"],
             "description": state["course_outline"]["description"],
             "prerequisites": state["course_outline"]["prerequisites"],
-            "modules": state["course_plan"].get("modules", [])
+            "modules": modules
         }
         
         return course
@@ -1103,62 +1588,163 @@ async def create_course_from_state(state: Dict) -> Dict:
         logger.error(f"Error creating course from state: {str(e)}", exc_info=True)
         raise
 
+# Number of distinct LLM assessment responses whose parse results are memoized
+ASSESSMENT_PARSE_CACHE_SIZE = 1024
+
+class AssessmentParser:
+    """Incremental parser for numbered assessment questions and their answers, fed one line at a time"""
+    
+    def __init__(self):
+        self.questions = []
+        self.answers = []
+        self.current_question = None
+        self.current_answer = None
+    
+    def feed(self, line: str) -> Optional[Tuple[str, Optional[str]]]:
+        """Consume a single line, returning the previous question once a new one starts"""
+        line = line.strip()
+        if not line:
+            return None
+        
+        # One compiled match classifies the line as a question, an answer, or neither
+        match = _ASSESSMENT_LINE_RE.match(line)
+        if match is None:
+            return None
+        if match.group('question') is None:
+            self.current_answer = match.group('answer').strip()
+            return None
+        
+        completed = None
+        if self.current_question:
+            completed = (self.current_question, self.current_answer)
+            self.questions.append(self.current_question)
+            self.answers.append(self.current_answer)
+        self.current_question = line
+        self.current_answer = None
+        return completed
+    
+    def finish(self) -> Optional[Tuple[str, str]]:
+        """Close the last question, returning it if it has an answer"""
+        completed = None
+        if self.current_question and self.current_answer:
+            completed = (self.current_question, self.current_answer)
+            self.questions.append(self.current_question)
+            self.answers.append(self.current_answer)
+        self.current_question = None
+        self.current_answer = None
+        return completed
+
+@functools.lru_cache(maxsize=ASSESSMENT_PARSE_CACHE_SIZE)
+def _parse_assessment(content: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """Parse assessment text into immutable (questions, answers) tuples"""
+    parser = AssessmentParser()
+    for line in content.splitlines():
+        parser.feed(line)
+    parser.finish()
+    return tuple(parser.questions), tuple(parser.answers)
+
+async def parse_assessment_stream(chunks: AsyncIterator[str]) -> AsyncIterator[Tuple[str, Optional[str]]]:
+    """Yield each (question, answer) pair as soon as it is complete in a streamed response"""
+    parser = AssessmentParser()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += chunk
+        end = buffer.rfind('\n')
+        if end < 0:
+            continue
+        # Parse the complete lines and keep the partial trailing line for the next chunk
+        complete, buffer = buffer[:end], buffer[end + 1:]
+        for line in complete.splitlines():
+            completed = parser.feed(line)
+            if completed:
+                yield completed
+    completed = parser.feed(buffer)
+    if completed:
+        yield completed
+    completed = parser.finish()
+    if completed:
+        yield completed
+
 def parse_assessment_content(content: str) -> Dict[str, Any]:
     """Parse assessment content from LLM response"""
     try:
-        questions = []
-        answers = []
-        
-        # Split content into lines and process each question
-        lines = content.strip().split('\n')
-        current_question = None
-        current_answer = None
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Check if line starts with a number (new question)
-            if re.match(r'^\d+\.', line):
-                if current_question:
-                    questions.append(current_question)
-                    answers.append(current_answer)
-                current_question = line
-                current_answer = None
-            elif line.lower().startswith(('answer:', 'correct answer:')):
-                current_answer = line.split(':', 1)[1].strip()
-        
-        # Add the last question
-        if current_question and current_answer:
-            questions.append(current_question)
-            answers.append(current_answer)
-        
+        # Identical responses (cache hits, retries) reuse the memoized parse;
+        # fresh lists keep the result safe for callers to mutate
+        questions, answers = _parse_assessment(content)
         return {
-            "questions": questions,
-            "answers": answers
+            "questions": list(questions),
+            "answers": list(answers)
         }
     except Exception as e:
         logger.error(f"Error parsing assessment content: {str(e)}")
         return {"questions": [], "answers": []}
 
 async def generate_section_content(prompt: str) -> str:
-    """Generate content for a section based on the given prompt"""
+    """Generate content for a section based on the given prompt, or return "" if generation failed"""
     try:
         messages = [
-            SystemMessage(content="""You are an expert educator creating focused, practical learning content.
-            Create content that is clear, engaging, and builds understanding step by step.
-            Use markdown formatting for better readability."""),
-            HumanMessage(content=prompt)
+            CONTENT_SYSTEM_MESSAGE,
+            HumanMessage(content=compact_prompt(prompt))
         ]
         
-        response = await llm.ainvoke(messages)
-        return response.content
+        return await cached_ainvoke(messages)
     except Exception as e:
+        # Empty content fails validate_course_structure, so a failed course is never saved
         logger.error(f"Error generating section content: {str(e)}")
-        return "Content generation failed"
+        return ""
 
-async def generate_session_assessment(session_number: str, topic: str, language: str) -> Dict[str, Any]:
+async def generate_session_sections(section_numbers: List[str], topic: str, language: str,
+                                    on_delta: Optional[Callable[[str], Awaitable[None]]] = None) -> Dict[str, str]:
+    """Generate the content for several sections in a single LLM call, keyed by section number"""
+    try:
+        section_list = "\n".join(f"        - Section {number}" for number in section_numbers)
+        prompt = f"""
+        Generate comprehensive content for each of the following sections about {topic} in {language}.
+        
+        Sections:
+{section_list}
+        
+        Write each section's content in markdown, with clear explanations and examples.
+        
+        Return ONLY JSON matching this schema:
+        {SESSION_SECTIONS_SCHEMA}
+        """
+        
+        messages = [
+            CONTENT_JSON_SYSTEM_MESSAGE,
+            HumanMessage(content=compact_prompt(prompt))
+        ]
+        
+        response = await stream_text(messages, json_llm, on_delta)
+        drafts = SessionSectionsResponse.model_validate_json(response).sections
+        
+        # Match drafts to sections by number, falling back to position for an unrecognized number
+        by_number = {draft.section_number: draft for draft in drafts}
+        contents = {}
+        for index, number in enumerate(section_numbers):
+            draft = by_number.get(number)
+            if draft is None and index < len(drafts) and drafts[index].section_number not in section_numbers:
+                draft = drafts[index]
+            if draft is not None and draft.content.strip():
+                contents[number] = draft.content
+    except Exception as e:
+        logger.error(f"Error generating batched section content: {str(e)}")
+        contents = {}
+    
+    # Fall back to one call per section for anything the batch did not return
+    missing = [number for number in section_numbers if number not in contents]
+    if missing:
+        logger.warning(f"Batched section content missing {len(missing)} section(s), generating them individually")
+        results = await asyncio.gather(*(
+            generate_section_content(f"Generate comprehensive content for section {number} about {topic} in {language}.")
+            for number in missing
+        ))
+        contents.update(zip(missing, results))
+    
+    return contents
+
+async def generate_session_assessment(session_number: str, topic: str, language: str,
+                                     on_delta: Optional[Callable[[str], Awaitable[None]]] = None) -> Dict[str, Any]:
     """Generate assessment questions for a session"""
     try:
         prompt = f"""
@@ -1179,101 +1765,93 @@ async def generate_session_assessment(session_number: str, topic: str, language:
         """
         
         messages = [
-            SystemMessage(content="""You are an expert in creating effective assessments.
-            Create questions that test both understanding and practical application.
-            Make questions clear and unambiguous."""),
-            HumanMessage(content=prompt)
+            ASSESSMENT_SYSTEM_MESSAGE,
+            HumanMessage(content=compact_prompt(prompt))
         ]
         
-        response = await llm.ainvoke(messages)
-        assessment = parse_assessment_content(response.content)
+        if on_delta is None:
+            response = await cached_ainvoke(messages)
+            return parse_assessment_content(response)
+        
+        async def chunks() -> AsyncIterator[str]:
+            async for chunk in cached_astream(messages):
+                await on_delta(chunk)
+                yield chunk
+        
+        # Parse questions while the response is still streaming
+        questions = []
+        answers = []
+        async for question, answer in parse_assessment_stream(chunks()):
+            questions.append(question)
+            answers.append(answer)
         
         return {
-            "questions": assessment.get("questions", []),
-            "answers": assessment.get("answers", [])
+            "questions": questions,
+            "answers": answers
         }
     except Exception as e:
         logger.error(f"Error generating assessment: {str(e)}")
         return {"questions": [], "answers": []}
 
+# Child list and allowed child count at each level of the course tree, from the course down to sections
+COURSE_STRUCTURE_LEVELS = (
+    ('modules', 'Module', 2, 3),
+    ('sessions', 'Session', 3, 5),
+    ('sections', 'Section', 2, 4),
+)
+
+def has_assessment(session: Dict[str, Any]) -> bool:
+    """Whether a session has an assessment with at least one question"""
+    assessment = session.get('assessment')
+    return isinstance(assessment, dict) and bool(assessment.get('questions'))
+
+def _iter_structure_errors(node: Any, name: str, path: str = "", depth: int = 0) -> Iterator[str]:
+    """Lazily yield structure problems in a course subtree, so the first one stops the walk"""
+    if not isinstance(node, dict):
+        yield f"{name} must be a dictionary"
+        return
+    if depth == len(COURSE_STRUCTURE_LEVELS):
+        content = node.get('content')
+        if not isinstance(content, str) or not content.strip():
+            yield f"{name} must have content"
+        return
+    
+    key, child_label, low, high = COURSE_STRUCTURE_LEVELS[depth]
+    # Sessions are the nodes holding sections, and each also needs its assessment
+    if key == 'sections' and not has_assessment(node):
+        yield f"{name} must have an assessment"
+        return
+    children = node.get(key)
+    if children is None:
+        yield f"{name} must have {key}"
+        return
+    if not isinstance(children, list):
+        yield f"{key.capitalize()} in {name} must be a list"
+        return
+    if not (low <= len(children) <= high):
+        yield f"{name} must have {low}-{high} {key}, found {len(children)}"
+        return
+    
+    for index, child in enumerate(children, 1):
+        child_path = f"{path}.{index}" if path else str(index)
+        yield from _iter_structure_errors(child, f"{child_label} {child_path}", child_path, depth + 1)
+
 def validate_course_structure(course: Dict[str, Any]) -> bool:
     """Validate that the course follows the required structure"""
     try:
-        # Check basic course structure
-        if not isinstance(course, dict):
-            logger.error("Course must be a dictionary")
-            return False
-        
-        if 'modules' not in course:
-            logger.error("Course must have modules")
-            return False
-        
-        modules = course['modules']
-        if not isinstance(modules, list):
-            logger.error("Modules must be a list")
+        error = next(_iter_structure_errors(course, "Course"), None)
+        if error:
+            logger.error(error)
             return False
-        
-        # Check module count
-        if not (2 <= len(modules) <= 3):
-            logger.error(f"Course must have 2-3 modules, found {len(modules)}")
-            return False
-        
-        # Check each module
-        for i, module in enumerate(modules, 1):
-            if not isinstance(module, dict):
-                logger.error(f"Module {i} must be a dictionary")
-                return False
-            
-            if 'sessions' not in module:
-                logger.error(f"Module {i} must have sessions")
-                return False
-            
-            sessions = module['sessions']
-            if not isinstance(sessions, list):
-                logger.error(f"Sessions in module {i} must be a list")
-                return False
-            
-            # Check session count
-            if not (3 <= len(sessions) <= 5):
-                logger.error(f"Module {i} must have 3-5 sessions, found {len(sessions)}")
-                return False
-            
-            # Check each session
-            for j, session in enumerate(sessions, 1):
-                if not isinstance(session, dict):
-                    logger.error(f"Session {i}.{j} must be a dictionary")
-                    return False
-                
-                if 'sections' not in session:
-                    logger.error(f"Session {i}.{j} must have sections")
-                    return False
-                
-                sections = session['sections']
-                if not isinstance(sections, list):
-                    logger.error(f"Sections in session {i}.{j} must be a list")
-                    return False
-                
-                # Check section count
-                if not (2 <= len(sections) <= 4):
-                    logger.error(f"Session {i}.{j} must have 2-4 sections, found {len(sections)}")
-                    return False
-                
-                # Validate section content
-                for k, section in enumerate(sections, 1):
-                    if not isinstance(section, dict):
-                        logger.error(f"Section {i}.{j}.{k} must be a dictionary")
-                        return False
-                    
-                    if not section.get('section_content'):
-                        logger.error(f"Section {i}.{j}.{k} must have content")
-                        return False
-        
         return True
     
     except Exception as e:
         logger.error(f"Error validating course structure: {str(e)}")
         return False
 
+# Maximum number of progress events buffered between generation workers and the caller
+GENERATION_EVENT_QUEUE_SIZE = 64
+
 async def generate_course(topic: str, language: str = "English") -> AsyncGenerator[Dict[str, Any], None]:
     """Generate a course with proper structure validation"""
     try:
@@ -1320,31 +1898,115 @@ async def generate_course(topic: str, language: str = "English") -> AsyncGenerat
             course["modules"].append(module)
             yield {"status": f"Generated module {module_idx + 1} structure", "progress": 20 + (module_idx * 20)}
         
-        # Generate content for each section
-        total_sections = sum(len(s["sections"]) for m in course["modules"] for s in m["sessions"])
-        current_section = 0
+        # Refuse an oversized course before any section or assessment is requested;
+        # generate_course asks for each session's assessment separately
+        check_generation_budget(course["modules"], batched_assessments=False)
+        
+        # Resume an interrupted run of the same course structure, keeping the content it already generated
+        path = checkpoint_path(topic, language, course)
+        checkpoint = await asyncio.to_thread(load_checkpoint, path)
+        if checkpoint and checkpoint.get("modules"):
+            logger.info(f"Resuming course generation from checkpoint {path}")
+            course = checkpoint
+        checkpoint_lock = asyncio.Lock()
+        
+        async def save_progress():
+            async with checkpoint_lock:
+                try:
+                    await asyncio.to_thread(save_checkpoint, path, course)
+                except OSError as e:
+                    logger.warning(f"Could not save checkpoint: {str(e)}")
+        
+        # Generate section content and session assessments concurrently, bounded by the semaphore;
+        # workers stream their responses and report through a queue the generator drains
+        semaphore = asyncio.Semaphore(LLM_CONCURRENCY)
+        # Bounded; streaming deltas never wait on it, only completion events do
+        events: asyncio.Queue = asyncio.Queue(maxsize=GENERATION_EVENT_QUEUE_SIZE)
+        
+        def reporter(label: str) -> Callable[[str], Awaitable[None]]:
+            received = 0
+            unsent = ""
+            async def on_delta(chunk: str):
+                # Called while the stream holds an LLM limiter slot, so it must not
+                # block on a slow caller; text that does not fit is sent with the next chunk
+                nonlocal received, unsent
+                received += len(chunk)
+                unsent += chunk
+                try:
+                    events.put_nowait({"status": f"{label} ({received:,} characters)", "delta": unsent})
+                except asyncio.QueueFull:
+                    return
+                unsent = ""
+            return on_delta
+        
+        async def fill_sections(session: Dict) -> str:
+            async with semaphore:
+                # One batched call per session instead of one per section
+                contents = await generate_session_sections(
+                    [section["section_number"] for section in session["sections"]],
+                    topic=topic,
+                    language=language,
+                    on_delta=reporter(f"Writing content for session {session['session_number']}")
+                )
+            for section in session["sections"]:
+                section["content"] = contents.get(section["section_number"], "")
+            return f"Generated content for session {session['session_number']}"
         
-        for module in course["modules"]:
-            for session in module["sessions"]:
-                for section in session["sections"]:
-                    current_section += 1
-                    progress = 40 + int((current_section / total_sections) * 50)
-                    
-                    yield {
-                        "status": f"Generating content for section {section['section_number']}",
-                        "progress": progress
-                    }
-                    
-                    # Generate section content
-                    section_prompt = f"Generate comprehensive content for section {section['section_number']} about {topic} in {language}."
-                    section["content"] = await generate_section_content(section_prompt)
-                
-                # Generate session assessment
-                session["assessment"] = await generate_session_assessment(
+        async def fill_assessment(session: Dict) -> str:
+            async with semaphore:
+                assessment = await generate_session_assessment(
                     session_number=session["session_number"],
                     topic=topic,
-                    language=language
+                    language=language,
+                    on_delta=reporter(f"Writing assessment for session {session['session_number']}")
                 )
+            # A failed assessment is left out, so it is neither checkpointed nor saved, and a resumed run retries it
+            if not assessment["questions"]:
+                return f"Assessment generation failed for session {session['session_number']}"
+            session["assessment"] = assessment
+            return f"Created assessment for session {session['session_number']}"
+        
+        async def run(job) -> None:
+            try:
+                status = await job
+                await save_progress()
+                event = {"status": status, "done": True}
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    raise  # generate_course is shutting down and no longer reads events
+                # Cancelled underneath rather than by generate_course: still report the job,
+                # so the completed count always reaches the total
+                event = {"error": RuntimeError("Generation job was cancelled"), "done": True}
+            except Exception as e:
+                event = {"error": e, "done": True}
+            await events.put(event)
+        
+        sessions = [session for module in course["modules"] for session in module["sessions"]]
+        # Sessions restored from a checkpoint only need the parts that are still missing
+        jobs = [
+            fill_sections(session) for session in sessions
+            if not all(section["content"] for section in session["sections"])
+        ] + [fill_assessment(session) for session in sessions if not has_assessment(session)]
+        tasks = [asyncio.ensure_future(run(job)) for job in jobs]
+        
+        try:
+            total = len(tasks)
+            completed = 0
+            progress = 40
+            while completed < total:
+                event = await events.get()
+                if "error" in event:
+                    raise event["error"]
+                if event.get("done"):
+                    completed += 1
+                    progress = 40 + (completed * 50) // total
+                    yield {"status": event["status"], "progress": progress}
+                else:
+                    yield {"status": event["status"], "progress": progress, "delta": event["delta"]}
+        finally:
+            # Stop outstanding LLM calls if the consumer goes away or a task fails
+            for task in tasks:
+                task.cancel()
         
         # Validate final course structure
         if not validate_course_structure(course):
@@ -1355,6 +2017,8 @@ async def generate_course(topic: str, language: str = "English") -> AsyncGenerat
             }
             return
         
+        await asyncio.to_thread(remove_checkpoint, path)
+        
         yield {
             "status": "Course generation complete",
             "progress": 100,
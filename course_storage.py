@@ -1,14 +1,23 @@
 import os
-import json
 import logging
+import threading
 from typing import Dict, Any, Optional
 from datetime import datetime
 
+import json_utils
+
 logger = logging.getLogger(__name__)
 
+# Sidecar file holding the list_courses metadata, so listing never parses full course bodies
+INDEX_FILE = "_index.json"
+
 class CourseStorage:
     def __init__(self, storage_dir: str = "courses"):
         self.storage_dir = storage_dir
+        self.index_path = os.path.join(storage_dir, INDEX_FILE)
+        self._index = None
+        self._dir_mtime = None  # Directory mtime when the index was last reconciled
+        self._index_lock = threading.Lock()
         self._ensure_storage_dir()
     
     def _ensure_storage_dir(self):
@@ -35,9 +44,14 @@ class CourseStorage:
             # Create the course file path
             file_path = os.path.join(self.storage_dir, f"{course_id}.json")
             
-            # Save the course data
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(course_data, f, indent=2, ensure_ascii=False)
+            # Save the course data; a crash mid-write never leaves a truncated course behind
+            json_utils.write_atomic(file_path, json_utils.dumps(course_data))
+            
+            # Record the new course directly; an index not loaded yet picks it up from disk on first use
+            with self._index_lock:
+                if self._index is not None:
+                    self._index[course_id] = self._course_summary(course_id, course_data, os.stat(file_path).st_mtime)
+                    self._save_index(self._index)
             
             logger.info(f"Course saved successfully: {course_id}")
             return course_id
@@ -53,8 +67,8 @@ class CourseStorage:
             if not os.path.exists(file_path):
                 return None
             
-            with open(file_path, 'r', encoding='utf-8') as f:
-                course_data = json.load(f)
+            with open(file_path, 'rb') as f:
+                course_data = json_utils.loads(f.read())
             
             logger.info(f"Course loaded successfully: {course_id}")
             return course_data
@@ -65,19 +79,78 @@ class CourseStorage:
 
     def list_courses(self) -> Dict[str, Dict[str, Any]]:
         """List all available courses with their basic info"""
-        courses = {}
-        for file_name in os.listdir(self.storage_dir):
-            if file_name.endswith('.json'):
-                course_id = file_name[:-5]  # Remove .json extension
+        with self._index_lock:
+            return dict(self._get_index())
+    
+    def _course_summary(self, course_id: str, course_data: Dict[str, Any], mtime: float) -> Dict[str, Any]:
+        """Build the index entry for a course; mtime tells when the file has changed since"""
+        return {
+            'topic': course_data['topic'],
+            'language': course_data.get('language', ''),
+            'modules': len(course_data.get('modules', [])),
+            'created': course_id.split('_')[-2:],  # Extract date and time
+            'mtime': mtime
+        }
+    
+    def _get_index(self) -> Dict[str, Dict[str, Any]]:
+        """Return the course index, brought in line with the course files currently on disk"""
+        if self._index is None:
+            try:
+                with open(self.index_path, 'rb') as f:
+                    self._index = json_utils.loads(f.read())
+            except FileNotFoundError:
+                self._index = {}
+            except Exception as e:
+                logger.error(f"Error reading course index, rebuilding: {str(e)}")
+                self._index = {}
+        # Adding, deleting or replacing a course file changes the directory mtime;
+        # while it is unchanged the index is current and no course file is touched
+        dir_mtime = os.stat(self.storage_dir).st_mtime_ns
+        if dir_mtime != self._dir_mtime:
+            self._sync_index(self._index)
+            # Saving the index replaces a file too, so read the mtime again afterwards
+            self._dir_mtime = os.stat(self.storage_dir).st_mtime_ns
+        return self._index
+    
+    def _sync_index(self, index: Dict[str, Dict[str, Any]]):
+        """Drop entries whose file is gone and re-read only new or modified course files"""
+        changed = False
+        seen = set()
+        with os.scandir(self.storage_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.json') or entry.name == INDEX_FILE:
+                    continue
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                course_id = entry.name[:-5]  # Remove .json extension
+                seen.add(course_id)
+                mtime = entry.stat(follow_symlinks=False).st_mtime
+                summary = index.get(course_id)
+                if summary is not None and summary.get('mtime') == mtime:
+                    continue
+                changed = True
                 try:
                     course_data = self.load_course(course_id)
                     if course_data:
-                        courses[course_id] = {
-                            'topic': course_data['topic'],
-                            'language': course_data['language'],
-                            'modules': len(course_data.get('modules', [])),
-                            'created': course_id.split('_')[-2:]  # Extract date and time
-                        }
+                        index[course_id] = self._course_summary(course_id, course_data, mtime)
+                    else:
+                        index.pop(course_id, None)
                 except Exception as e:
                     logger.error(f"Error loading course {course_id}: {str(e)}")
-        return courses
+                    index.pop(course_id, None)
+        
+        for course_id in index.keys() - seen:
+            del index[course_id]
+            changed = True
+        
+        if changed:
+            self._save_index(index)
+            logger.info(f"Updated course index, {len(index)} courses")
+    
+    def _save_index(self, index: Dict[str, Dict[str, Any]]):
+        """Atomically replace the index file"""
+        try:
+            json_utils.write_atomic(self.index_path, json_utils.dumps_compact(index))
+        except OSError as e:
+            # The in-memory index stays authoritative; the file is rebuilt on next start if missing
+            logger.error(f"Error saving course index: {str(e)}")
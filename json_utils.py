@@ -0,0 +1,36 @@
+import os
+import threading
+import orjson
+from typing import Any
+
+# Keep the on-disk files human readable, matching the previous json.dump(indent=2) output
+_DUMP_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+
+def dumps(data: Any) -> bytes:
+    """Serialize data to UTF-8 encoded JSON bytes"""
+    return orjson.dumps(data, option=_DUMP_OPTIONS)
+
+def dumps_compact(data: Any) -> bytes:
+    """Serialize data without indentation, for files only the app reads back"""
+    return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+
+def loads(data: bytes) -> Any:
+    """Deserialize JSON bytes (or str) into Python objects"""
+    return orjson.loads(data)
+
+def write_atomic(path: str, payload: bytes) -> None:
+    """Replace the file at path so readers only ever see the old or the complete new contents"""
+    # Unique per writer thread, so concurrent saves of the same file never share a temp file
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -1,15 +1,31 @@
+import atexit
+import copy
 import os
-import json
 import logging
-from typing import Dict, Any, Optional
+import threading
+from typing import Dict, Any, Optional, Set
 from datetime import datetime
 
+import json_utils
+
 logger = logging.getLogger(__name__)
 
+# Seconds an updated progress record may stay only in memory before it is written to disk
+PROGRESS_FLUSH_DELAY = 2.0
+
 class ProgressTracker:
-    def __init__(self, storage_dir: str = "progress"):
+    def __init__(self, storage_dir: str = "progress", flush_delay: float = PROGRESS_FLUSH_DELAY):
         self.storage_dir = storage_dir
+        self.flush_delay = flush_delay
+        # Latest progress per course, so updates don't re-read and re-parse the file
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        # Courses whose cached progress is newer than their file
+        self._dirty: Set[str] = set()
+        self._flush_timer: Optional[threading.Timer] = None
+        self._lock = threading.RLock()
         self._ensure_storage_dir()
+        # Write batched updates that are still pending when the process exits
+        atexit.register(self.flush)
     
     def _ensure_storage_dir(self):
         """Ensure the storage directory exists"""
@@ -28,9 +44,11 @@ class ProgressTracker:
             # Add timestamp
             progress_data['last_updated'] = datetime.now().isoformat()
             
-            # Save the progress data
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(progress_data, f, indent=2, ensure_ascii=False)
+            # Save the progress data; a crash mid-write keeps the previous progress intact
+            json_utils.write_atomic(file_path, json_utils.dumps_compact(progress_data))
+            with self._lock:
+                self._cache[course_id] = copy.deepcopy(progress_data)
+                self._dirty.discard(course_id)
             
             logger.info(f"Progress saved for course: {course_id}")
             
@@ -40,6 +58,13 @@ class ProgressTracker:
     
     def load_progress(self, course_id: str) -> Dict[str, Any]:
         """Load progress data for a course"""
+        return copy.deepcopy(self._get_progress(course_id))
+    
+    def _get_progress(self, course_id: str) -> Dict[str, Any]:
+        """Return the cached progress for a course, reading it from disk on first use"""
+        progress_data = self._cache.get(course_id)
+        if progress_data is not None:
+            return progress_data
         try:
             file_path = self._get_progress_file(course_id)
             if not os.path.exists(file_path):
@@ -53,8 +78,9 @@ class ProgressTracker:
                     'last_updated': datetime.now().isoformat()
                 }
             
-            with open(file_path, 'r', encoding='utf-8') as f:
-                progress_data = json.load(f)
+            with open(file_path, 'rb') as f:
+                progress_data = json_utils.loads(f.read())
+            self._cache[course_id] = progress_data
             
             logger.info(f"Progress loaded for course: {course_id}")
             return progress_data
@@ -78,20 +104,45 @@ class ProgressTracker:
     
     def update_session_progress(self, course_id: str, module_idx: int, session_idx: int, 
                               completed: bool = True, score: Optional[float] = None) -> Dict[str, Any]:
-        """Update progress for a specific session"""
-        progress_data = self.load_progress(course_id)
-        
-        session_key = f"{module_idx}_{session_idx}"
-        if completed:
-            if session_key not in progress_data['completed_sessions']:
-                progress_data['completed_sessions'].append(session_key)
-        
-        if score is not None:
-            progress_data['assessment_scores'][session_key] = score
-        
-        progress_data['current_module'] = module_idx
-        progress_data['current_session'] = session_idx
-        progress_data['last_updated'] = datetime.now().isoformat()
-        
-        self.save_progress(course_id, progress_data)
-        return progress_data
+        """Update progress for a specific session; the write is batched and happens within flush_delay seconds"""
+        # Updates arrive from worker threads; keep each read-modify-write atomic
+        with self._lock:
+            progress_data = self._cache[course_id] = self._get_progress(course_id)
+            
+            session_key = f"{module_idx}_{session_idx}"
+            if completed:
+                if session_key not in progress_data['completed_sessions']:
+                    progress_data['completed_sessions'].append(session_key)
+            
+            if score is not None:
+                progress_data['assessment_scores'][session_key] = score
+            
+            progress_data['current_module'] = module_idx
+            progress_data['current_session'] = session_idx
+            progress_data['last_updated'] = datetime.now().isoformat()
+            
+            # Coalesce rapid updates into one write per course
+            self._dirty.add(course_id)
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_delay, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+            return copy.deepcopy(progress_data)
+    
+    def flush(self) -> None:
+        """Write every progress record updated since the last flush"""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            dirty, self._dirty = self._dirty, set()
+            for course_id in dirty:
+                try:
+                    file_path = self._get_progress_file(course_id)
+                    json_utils.write_atomic(file_path, json_utils.dumps_compact(self._cache[course_id]))
+                except Exception as e:
+                    # Keep it dirty so the next flush tries again
+                    logger.error(f"Error saving progress: {str(e)}")
+                    self._dirty.add(course_id)
+            if dirty:
+                logger.info(f"Progress saved for {len(dirty)} course(s)")